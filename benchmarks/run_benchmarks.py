@@ -0,0 +1,259 @@
+"""
+Offline micro-benchmarks for the indicator, stream decode and order signing paths.
+
+    python -m benchmarks.run_benchmarks                 # compare against benchmarks/baseline.json
+    python -m benchmarks.run_benchmarks --save          # record a new baseline
+    python -m benchmarks.run_benchmarks -k per_candle   # only benchmarks whose name contains "per_candle"
+
+Everything runs on seeded synthetic data, no network or API keys needed. Each benchmark reports the median
+per-call time over several repeats, and the median ratio to a fixed pure-Python calibration workload timed
+alongside it. Those ratios ("units") are what the baseline stores and compares, so a baseline recorded on
+one box is usable on another. A run fails (exit code 1) when any benchmark is slower than
+`threshold` x its baseline.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import timeit
+
+from utils.indicator_cache import CandleCache
+from utils.resampler import CandleResampler
+from utils.trade_executer import BinanceFuturesTrader, _wire
+from utils.websocket_handler import parse_kline_message
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_THRESHOLD = 1.5  # run-to-run noise alone reaches ~1.3x on shared machines
+DEFAULT_REPEAT = 7
+INTERVAL_MS = 5 * 60 * 1000
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """ Register a setup function; it builds the synthetic inputs and returns the zero-arg callable to time. """
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def synthetic_candles(n: int, seed: int = 0, start_price: float = 150.0):
+    """ Closed 5m candles from a seeded random walk, aligned like exchange klines and ending before now. """
+    rng = random.Random(seed)
+    end = int(time.time() * 1000) // INTERVAL_MS * INTERVAL_MS - INTERVAL_MS
+    price = start_price
+    candles = []
+    for i in range(n):
+        open_time = end - (n - i) * INTERVAL_MS
+        open_ = price
+        price = max(0.01, price * (1 + rng.gauss(0, 0.002)))
+        candles.append({
+            'timestamp': open_time,
+            'open': open_,
+            'high': max(open_, price) * (1 + abs(rng.gauss(0, 0.001))),
+            'low': min(open_, price) * (1 - abs(rng.gauss(0, 0.001))),
+            'close': price,
+            'volume': rng.uniform(100, 10000),
+            'close_time': open_time + INTERVAL_MS - 1,
+        })
+    return candles
+
+
+def synthetic_kline_messages(n: int, closed_every: int = 10, seed: int = 0):
+    """ Raw kline websocket payloads; one in `closed_every` marks a closed candle, like a live 5m stream. """
+    messages = []
+    for i, c in enumerate(synthetic_candles(n, seed=seed)):
+        messages.append(json.dumps({
+            "e": "kline", "E": c['close_time'], "s": "SOLUSDT",
+            "k": {
+                "t": c['timestamp'], "T": c['close_time'], "s": "SOLUSDT", "i": "5m", "f": 1, "L": 2,
+                "o": f"{c['open']:.2f}", "c": f"{c['close']:.2f}", "h": f"{c['high']:.2f}", "l": f"{c['low']:.2f}",
+                "v": f"{c['volume']:.2f}", "n": 100, "x": i % closed_every == 0, "q": "0", "V": "0", "Q": "0", "B": "0",
+            },
+        }))
+    return messages
+
+
+def _per_candle(symbols: int):
+    caches = [CandleCache(historical_data=synthetic_candles(150, seed=s)) for s in range(symbols)]
+    feeds = [synthetic_candles(64, seed=10_000 + s) for s in range(symbols)]
+    state = {"i": 0}
+
+    def run():
+        i = state["i"] = (state["i"] + 1) % 64
+        for cache, feed in zip(caches, feeds):
+            cache.add_candle(feed[i])
+            cache.calculate_bollinger_bands(period=30, num_std_dev=2)
+            cache.calculate_rsi(period=7)
+    return run
+
+
+@benchmark("per_candle_1_symbol")
+def per_candle_1():
+    return _per_candle(1)
+
+
+@benchmark("per_candle_50_symbols")
+def per_candle_50():
+    return _per_candle(50)
+
+
+@benchmark("per_candle_500_symbols")
+def per_candle_500():
+    return _per_candle(500)
+
+
+def _warmup(n: int):
+    history = synthetic_candles(n)
+    return lambda: CandleCache(historical_data=history)
+
+
+@benchmark("warmup_150_candles")
+def warmup_150():
+    return _warmup(150)
+
+
+@benchmark("warmup_10k_candles")
+def warmup_10k():
+    return _warmup(10_000)
+
+
+@benchmark("warmup_100k_candles")
+def warmup_100k():
+    return _warmup(100_000)
+
+
+@benchmark("kline_decode_1k_messages")
+def kline_decode():
+    messages = synthetic_kline_messages(1_000)
+
+    def run():
+        for msg in messages:
+            parse_kline_message(msg)
+    return run
+
+
+@benchmark("resample_1k_candles_15m_1h")
+def resample():
+    candles = synthetic_candles(1_000)
+
+    def run():
+        resampler = CandleResampler("5m", ["15m", "1h"])
+        for candle in candles:
+            resampler.add_candle(candle)
+    return run
+
+
+def _trader():
+    trader = BinanceFuturesTrader()
+    trader.api_secret = "0" * 64  # synthetic secret, _sign never leaves the process
+    return trader
+
+
+@benchmark("sign_order")
+def sign_order():
+    trader = _trader()
+    params = {'symbol': 'SOLUSDT', 'side': 'SELL', 'type': 'STOP_MARKET', 'stopPrice': 142.68,
+              'quantity': 17.43, 'timeInForce': 'GTC', 'timestamp': 1718000000000}
+    return lambda: trader._sign(params)
+
+
+@benchmark("serialize_and_sign_batch_5")
+def sign_batch():
+    trader = _trader()
+    orders = [{'symbol': 'SOLUSDT', 'side': 'SELL', 'type': 'STOP_MARKET', 'stopPrice': 142.68 + i,
+               'quantity': 17.43, 'timeInForce': 'GTC'} for i in range(5)]
+
+    def run():
+        chunk = [{k: _wire(v) for k, v in order.items()} for order in orders]
+        params = {'batchOrders': json.dumps(chunk, separators=(',', ':')), 'timestamp': 1718000000000}
+        trader._sign(params)
+    return run
+
+
+def measure(fn, reference, repeat: int):
+    """
+    Median seconds per call, and the median ratio to `reference` timed right before each repeat, so a load
+    spike on the machine slows both sides of a ratio. Loop counts are picked by timeit (>= 0.2s per repeat).
+    """
+    timer, ref_timer = timeit.Timer(fn), timeit.Timer(reference)
+    number, _ = timer.autorange()
+    ref_number, _ = ref_timer.autorange()
+    seconds, ratios = [], []
+    for _ in range(repeat):
+        ref = ref_timer.timeit(ref_number) / ref_number
+        seconds.append(timer.timeit(number) / number)
+        ratios.append(seconds[-1] / ref)
+    return statistics.median(seconds), statistics.median(ratios)
+
+
+def calibration():
+    """ Fixed interpreter-bound workload; benchmark times are reported in multiples of it. """
+    rng = random.Random(0)
+    values = [rng.random() for _ in range(2_000)]
+
+    def run():
+        total = 0.0
+        for v in sorted(values):
+            total += v * v
+        return json.dumps({"total": total})
+    return run
+
+
+def _format(seconds: float):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f} {unit}"
+    return f"{seconds / 1e-9:8.2f} ns"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-k", "--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="timing repeats per benchmark (median is kept)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="fail when current > threshold x baseline")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON file")
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f).get("normalized", {})
+
+    results = {}
+    regressions = []
+    for name, setup in BENCHMARKS.items():
+        if args.filter not in name:
+            continue
+        seconds, normalized = measure(setup(), calibration(), args.repeat)
+        results[name] = normalized
+        line = f"{name:<30} {_format(seconds)} {normalized:12.4g} units"
+        if name in baseline:
+            ratio = normalized / baseline[name]
+            line += f"   {ratio:5.2f}x baseline"
+            if ratio > args.threshold:
+                line += "   REGRESSION"
+                regressions.append(name)
+        print(line, flush=True)
+
+    if args.save:
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump({"unit": "calibration() runs per call", "normalized": baseline}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) slower than {args.threshold}x baseline: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,342 +1,489 @@
 from utils.websocket_handler import candle_stream
+from utils.breakeven_manager import BreakevenManager
+from utils.order_reconciler import OrderReconciler
+from utils.exchange_info import ExchangeInfoCache
+from utils.portfolio_risk import PortfolioRisk
+from utils.resampler import CandleResampler
+from utils.config import load_config
 from utils.logger import init_logger
 from time import sleep
 import utils.indicator_cache as indicator 
 import utils.binancehelpers as binance
 import utils.trade_executer as execute
-import asyncio, logging, websockets
-from utils.supabase_client import log_into_supabase, get_latest_group_id, get_latest_trades
+import argparse, asyncio, logging, threading
+from functools import partial
+from utils.supabase_client import log_into_supabase, get_latest_group_id, get_latest_trades, get_bracket_rows, strategy_env
 import os
 from datetime import datetime
-from dotenv import load_dotenv
-
-load_dotenv()
-
-supabase_url = os.getenv("SUPABASE_URL")
-order_table_name = os.getenv("ORDER_TABLE")
-supabase_api_key = os.getenv("SUPABASE_API_KEY")
-supbase_jwt = os.getenv("SUPABASE_JWT")
-# strategy = int(os.getenv("STRATEGY_ENV"))
-
-symbol = "SOLUSDT"
-interval = "5m"
-
-# if strategy == 1: 
-#     risk_amount = 15
-#     sl_percentage = 0.5
-#     fee = 0.1
-#     portfolio_threshold = 20
-#     rsi_lower = 30
-#     rsi_upper = 70
-#     sma_period = 30
-#     bb_std_dev = 2
-#     breakeven_buffer = 0.03
-#     rsi_period = 7
-#     max_concurrent_trades = 3
-# else: 
-#     risk_amount = 2
-#     sl_percentage = 0.5
-#     fee = 0.1
-#     portfolio_threshold = 20
-#     rsi_lower = 30
-#     rsi_upper = 70
-#     sma_period = 30
-#     bb_std_dev = 2
-#     breakeven_buffer = 0.03
-#     rsi_period = 7
-#     max_concurrent_trades = 3
-
-risk_amount = 15
-sl_percentage = 0.5
-fee = 0.1
-portfolio_threshold = 20
-rsi_lower = 30
-rsi_upper = 70
-sma_period = 30
-bb_std_dev = 2
-breakeven_buffer = 0.03
-rsi_period = 7
-max_concurrent_trades = 3
-
-usdt_entry_size = risk_amount / ((sl_percentage + fee) / 100)
-trade = execute.BinanceFuturesTrader()
-
-async def main():
-    init_logger()
-    cache = indicator.CandleCache()
-    historical_data = cache.fetch_historical_data(symbol=symbol, interval=interval, limit=150)
-    cache = indicator.CandleCache(historical_data=historical_data)
-    
+
+
+def on_breakeven_amended(bracket, new_sl, supabase, portfolio_risk):
+    sign = 1 if bracket['direction'] == "LONG" else -1
+    portfolio_risk.remove(bracket['order_id'])
+    portfolio_risk.upsert(new_sl['orderId'], bracket['symbol'], sign * float(bracket['quantity']), bracket['entry_price'], float(bracket['breakeven_price']))
+
+    data = {
+        "group_id": bracket['group_id'],
+        "order_id": new_sl['orderId'],
+        "type": "SL",
+        "direction": bracket['direction'],
+        "breakeven_threshold": 0.00,
+        "breakeven_price": 0.00
+    }
+    log_into_supabase(data, **supabase)
+
+async def trade_symbol(symbol, cache, resampler, config, trade, exchange_info, breakeven_manager, order_reconciler, portfolio_risk, supabase, entry_lock):
+    interval = config.interval
+    strategy = config.strategy
+    sl_percentage = strategy.sl_percentage
+    fee = strategy.fee
+    portfolio_threshold = strategy.portfolio_threshold
+    rsi_lower = strategy.rsi_lower
+    rsi_upper = strategy.rsi_upper
+    sma_period = strategy.sma_period
+    bb_std_dev = strategy.bb_std_dev
+    breakeven_buffer_percentage = strategy.breakeven_buffer_percentage
+    min_tp_gap_percentage = strategy.min_tp_gap_percentage
+    rsi_period = strategy.rsi_period
+    max_concurrent_trades = strategy.max_concurrent_trades
+    usdt_entry_size = strategy.usdt_entry_size
+
+    supabase_url = supabase['supabase_url']
+    supabase_api_key = supabase['api_key']
+    supbase_jwt = supabase['jwt']
+
     async for candle in candle_stream(symbol, interval):   # ← stays connected
 
-        group_id = get_latest_group_id(supabase_url=supabase_url, api_key=supabase_api_key, jwt=supbase_jwt)
-        group_id += 1    
+        try:
+            group_id = get_latest_group_id(supabase_url=supabase_url, api_key=supabase_api_key, jwt=supbase_jwt)
+            group_id += 1    
+            log_ctx = {"symbol": symbol, "group_id": group_id}
         
-        cache.add_candle(candle)
-        bb = cache.calculate_bollinger_bands(period = sma_period, num_std_dev = bb_std_dev)
-        rsi = cache.calculate_rsi(period = rsi_period)
-
-        if bb is not None:
-            logging.info(f"BB Upper: {bb['upper']} BB Lower: {bb['lower']} SMA: {bb['sma']}")
-        else:
-            logging.info("BB: None")
+            cache.add_candle(candle)
+            bb = cache.calculate_bollinger_bands(period = sma_period, num_std_dev = bb_std_dev)
+            rsi = cache.calculate_rsi(period = rsi_period)
+
+            # Higher timeframes only recompute when one of their bars closes on this candle
+            for htf_interval, _ in resampler.add_candle(candle):
+                htf_bb = resampler.caches[htf_interval].calculate_bollinger_bands(period = sma_period, num_std_dev = bb_std_dev)
+                logging.info("%s BB: %s", htf_interval, htf_bb, extra=log_ctx)
+
+            if bb is not None:
+                logging.info("BB Upper: %s BB Lower: %s SMA: %s", bb['upper'], bb['lower'], bb['sma'], extra=log_ctx)
+                order_reconciler.set_take_profit_price(symbol, exchange_info.round_price(symbol, bb['sma']))
+            else:
+                logging.info("BB: None", extra=log_ctx)
         
-        if rsi is not None: 
-            logging.info(f"RSI: {rsi}")
-        else: 
-            logging.info("RSI: None")
+            if rsi is not None: 
+                logging.info("RSI: %s", rsi, extra=log_ctx)
+            else: 
+                logging.info("RSI: None", extra=log_ctx)
         
-        percentage_at_risk = binance.percentage_at_risk(risk_amount)
-        logging.info(f"Portfolio risk: {percentage_at_risk}")
+            portfolio_risk.update_mark(symbol, candle['close'])
+            portfolio_risk.update_returns(symbol, cache.get_last_n_closes(100))
+            percentage_at_risk = portfolio_risk.percentage_at_risk()
+            logging.info("Portfolio risk: %s", percentage_at_risk, extra=log_ctx)
+            if percentage_at_risk is None:
+                logging.info("Account balance not loaded yet, no entry", extra=log_ctx)
+                continue
 
-        recent_trades = get_latest_trades(supabase_url=supabase_url, api_key=supabase_api_key, jwt=supbase_jwt)
-        order_count = binance.get_total_open_order()
+            recent_trades = get_latest_trades(supabase_url=supabase_url, api_key=supabase_api_key, jwt=supbase_jwt)
+            order_count = binance.get_total_open_order()
         
-        #######
-        # Checking if there are more than 10 open orders
-        #######
-        if order_count >= 10: 
-            continue
+            #######
+            # Checking if there are more than 10 open orders
+            #######
+            if order_count >= 10: 
+                continue
         
-        #######
-        # Cooldown after loss 
-        # Ensure no trades made within the next 5 mins after a loss 
-        #######
+            #######
+            # Cooldown after loss 
+            # Ensure no trades made within the next 5 mins after a loss 
+            #######
         
-        if recent_trades and recent_trades[0]['realized_pnl'] and recent_trades[0]['is_closed'] == True:
-            if recent_trades[0]['realized_pnl'] < 0:
-                last_exit_time = datetime.strptime(recent_trades[0]['exit_time'], "%Y-%m-%dT%H:%M:%S.%f")
-                now = datetime.utcnow()
-                difference_seconds = (now - last_exit_time).total_seconds()
-                if difference_seconds < 300: 
+            if recent_trades and recent_trades[0]['realized_pnl'] and recent_trades[0]['is_closed'] == True:
+                if recent_trades[0]['realized_pnl'] < 0:
+                    last_exit_time = datetime.strptime(recent_trades[0]['exit_time'], "%Y-%m-%dT%H:%M:%S.%f")
+                    now = datetime.utcnow()
+                    difference_seconds = (now - last_exit_time).total_seconds()
+                    if difference_seconds < 300: 
+                        continue
+
+            #######
+            # Max concurrent trades
+            #######
+            if recent_trades: 
+                open_trades = sum(1 for trade in recent_trades if not trade['is_closed'])
+                if open_trades > max_concurrent_trades: 
                     continue
-
-        #######
-        # Max concurrent trades
-        #######
-        if recent_trades: 
-            open_trades = sum(1 for trade in recent_trades if not trade['is_closed'])
-            if open_trades > max_concurrent_trades: 
-                continue
   
 
-        if percentage_at_risk < portfolio_threshold: 
+            if percentage_at_risk < portfolio_threshold: 
             
-            logging.info(f"Portfolio risk: {percentage_at_risk} percent lower than threshold: {portfolio_threshold}, looking for entry")
-            last_close = cache.candles[-1]['close']
-            prev_close = cache.candles[-2]['close']
-
-            prev_rsi = cache.get_previous_rsi()  
+                logging.info("Portfolio risk: %s percent lower than threshold: %s, looking for entry", percentage_at_risk, portfolio_threshold, extra=log_ctx)
+                last_close = cache.candles[-1]['close']
+                prev_close = cache.candles[-2]['close']
 
-            sol_entry_size = round(usdt_entry_size / last_close,2)
-            sma = round(bb['sma'],2)
+                prev_rsi = cache.get_previous_rsi()  
 
-            strategy_condition_long = (
-                (prev_close < bb['lower'] and last_close > bb['lower'] and 
-                rsi > rsi_lower and prev_rsi < rsi_lower and 
-                (rsi - prev_rsi) > 10)
-            )
+                entry_size = exchange_info.round_quantity(symbol, usdt_entry_size / last_close, market=True)
+                sma = exchange_info.round_price(symbol, bb['sma'])
 
-            strategy_condition_short = (
-                (prev_close > bb['upper'] and last_close < bb['upper'] and 
-                rsi < rsi_upper and prev_rsi > rsi_upper and 
-                (prev_rsi - rsi) > 10)
-            )
-
-            if strategy_condition_long:                
-                logging.info("Close price lower than lower bollinger band ... Entering LONG")
-                logging.info(f"Close price: {last_close}")
-                logging.info(f"Lower bollinger band: {bb['lower']}")
-
-                if (sma - last_close) < 0.5: ## this ensures that there is a reasonable gap between the SMA (TP) and the entry price, such that it will not enter if we are too close to TP 
+                if not exchange_info.is_valid_order(symbol, entry_size, last_close):
+                    logging.warning("Quantity %s below exchange minimums, skipping", entry_size, extra=log_ctx)
                     continue
 
-                try:
-                    logging.info(f"Quantity: {sol_entry_size}")
-                    market_in = trade.place_market_order(symbol=symbol, side = "BUY", quantity=sol_entry_size)
-                    sleep(1)
-                    logging.info(market_in)
-                    market_in_order_id = market_in['orderId']
-
-                except Exception as e:
-                    logging.error(f"Something went wrong executing MARKET IN ORDER, error: {e}")
-                    return e
+                strategy_condition_long = (
+                    (prev_close < bb['lower'] and last_close > bb['lower'] and 
+                    rsi > rsi_lower and prev_rsi < rsi_lower and 
+                    (rsi - prev_rsi) > 10)
+                )
+
+                strategy_condition_short = (
+                    (prev_close > bb['upper'] and last_close < bb['upper'] and 
+                    rsi < rsi_upper and prev_rsi > rsi_upper and 
+                    (prev_rsi - rsi) > 10)
+                )
+
+                if strategy_condition_long:                
+                    logging.info("Close price lower than lower bollinger band ... Entering LONG", extra=log_ctx)
+                    logging.info("Close price: %s", last_close, extra=log_ctx)
+                    logging.info("Lower bollinger band: %s", bb['lower'], extra=log_ctx)
+
+                    if (float(sma) - last_close) < last_close * min_tp_gap_percentage / 100: ## this ensures that there is a reasonable gap between the SMA (TP) and the entry price, such that it will not enter if we are too close to TP 
+                        continue
+
+                    projected_risk = portfolio_risk.projected_percentage(symbol, float(entry_size), last_close, last_close - (last_close * sl_percentage / 100))
+                    if projected_risk >= portfolio_threshold:
+                        logging.info("Entry would lift portfolio risk to %s percent, threshold: %s", projected_risk, portfolio_threshold, extra=log_ctx)
+                        continue
+
+                    # One entry at a time across symbol threads: the group_id is only claimed once the MO row is written
+                    with entry_lock:
+                        group_id = get_latest_group_id(supabase_url=supabase_url, api_key=supabase_api_key, jwt=supbase_jwt) + 1
+                        log_ctx = {"symbol": symbol, "group_id": group_id}
+                        order_reconciler.hold(symbol)
+                        try:
+                            logging.info("Quantity: %s", entry_size, extra=log_ctx)
+                            market_in = trade.place_market_order(symbol=symbol, side = "BUY", quantity=entry_size)
+                            sleep(1)
+                            logging.info("%s", market_in, extra=log_ctx)
+                            market_in_order_id = market_in['orderId']
+
+                        except Exception as e:
+                            logging.error("Something went wrong executing MARKET IN ORDER, error: %s", e, extra=log_ctx)
+                            order_reconciler.release(symbol, wake=True)
+                            continue
                                 
-                data = {
-                    "group_id": group_id,
-                    "order_id": market_in_order_id,
-                    "type": "MO",
-                    "direction": "LONG",
-                    "breakeven_threshold": 0.00,
-                    "breakeven_price": 0.00
-                }
-
-                try:
-                    log_into_supabase(data, supabase_url=supabase_url, api_key=supabase_api_key, jwt=supbase_jwt)
-                    logging.info("MARKET IN Trade logged to Supabase")
+                        data = {
+                            "group_id": group_id,
+                            "order_id": market_in_order_id,
+                            "type": "MO",
+                            "direction": "LONG",
+                            "breakeven_threshold": 0.00,
+                            "breakeven_price": 0.00
+                        }
+
+                        try:
+                            log_into_supabase(data, supabase_url=supabase_url, api_key=supabase_api_key, jwt=supbase_jwt)
+                            logging.info("MARKET IN Trade logged to Supabase", extra=log_ctx)
                 
-                except Exception as e:
-                    logging.error(f"Failed to log MARKET IN trade to Supabase: {e}")
+                        except Exception as e:
+                            logging.error("Failed to log MARKET IN trade to Supabase: %s", e, extra=log_ctx)
                 
-                sleep(2)
-                actual_entry_price = binance.entry_price(market_in_order_id)
-
-                stoploss_price = round(actual_entry_price - (actual_entry_price * sl_percentage / 100),2)
-                takeprofit_price = sma
-
-                try: 
-                    stoploss_order = trade.set_stop_loss(symbol=symbol, side="SELL", stop_price=stoploss_price, quantity=sol_entry_size)
-                    sleep(1)
-                    logging.info(stoploss_order)
-                    stoploss_order_id = stoploss_order['orderId']
-
-                except Exception as e:
-                    logging.error(f"Something went wrong executing STOPLOSS ORDER, error: {e}")
-                    return e
+                    sleep(2)
+                    actual_entry_price = binance.entry_price(market_in_order_id, symbol=symbol)
+
+                    stoploss_price = exchange_info.round_price(symbol, actual_entry_price - (actual_entry_price * sl_percentage / 100))
+                    takeprofit_price = sma
+
+                    try: 
+                        stoploss_order = trade.set_stop_loss(symbol=symbol, side="SELL", stop_price=stoploss_price, quantity=entry_size)
+                        sleep(1)
+                        logging.info("%s", stoploss_order, extra=log_ctx)
+                        stoploss_order_id = stoploss_order['orderId']
+                        portfolio_risk.upsert(stoploss_order_id, symbol, float(entry_size), actual_entry_price, float(stoploss_price))
+
+                    except Exception as e:
+                        logging.error("Something went wrong executing STOPLOSS ORDER, error: %s", e, extra=log_ctx)
+                        order_reconciler.release(symbol, wake=True)
+                        continue
                 
-                try:
-                    takeprofit_order = trade.set_take_profit_limit(symbol=symbol, side="SELL", stop_price=takeprofit_price, price=takeprofit_price, quantity=sol_entry_size)
-                    sleep(1)
-                    logging.info(takeprofit_order)
-                    takeprofit_order_id = takeprofit_order['orderId']
-
-                except Exception as e:
-                    logging.error(f"Something went wrong executing TAKEPROFIT ORDER, error: {e}")
-                    return e
+                    # SL row and breakeven go in before the TP, so a failed TP still leaves a bracket the reconciler can pair up
+                    # Breakeven calculations
+                    breakeven_price = exchange_info.round_price(symbol, actual_entry_price + (actual_entry_price * fee / 100))
+                    breakeven_indicator = float(breakeven_price) * (1 + breakeven_buffer_percentage / 100)
+
+                    # Log SL into DB 
+                    data = {
+                        "group_id": group_id,
+                        "order_id": stoploss_order_id,
+                        "type": "SL",
+                        "direction": "LONG",
+                        "breakeven_threshold": breakeven_indicator,
+                        "breakeven_price": float(breakeven_price)
+                    }
+                    try:
+                        log_into_supabase(data, supabase_url=supabase_url, api_key=supabase_api_key, jwt=supbase_jwt)
+                        logging.info("STOPLOSS Trade logged to Supabase", extra=log_ctx)
                 
-                # Breakeven calculations
-                breakeven_price = round(actual_entry_price + (actual_entry_price * fee / 100),2)
-                breakeven_indicator = breakeven_price + breakeven_buffer
-
-                # Log SL into DB 
-                data = {
-                    "group_id": group_id,
-                    "order_id": stoploss_order_id,
-                    "type": "SL",
-                    "direction": "LONG",
-                    "breakeven_threshold": breakeven_indicator,
-                    "breakeven_price": breakeven_price
-                }
-                try:
-                    log_into_supabase(data, supabase_url=supabase_url, api_key=supabase_api_key, jwt=supbase_jwt)
-                    logging.info("STOPLOSS Trade logged to Supabase")
+                    except Exception as e:
+                        logging.error("Failed to log STOPLOSS trade to Supabase: %s", e, extra=log_ctx)
+
+                    breakeven_manager.add({
+                        "group_id": group_id,
+                        "symbol": symbol,
+                        "direction": "LONG",
+                        "order_id": stoploss_order_id,
+                        "quantity": entry_size,
+                        "entry_price": actual_entry_price,
+                        "breakeven_threshold": breakeven_indicator,
+                        "breakeven_price": breakeven_price
+                    })
+
+                    try:
+                        takeprofit_order = trade.set_take_profit_limit(symbol=symbol, side="SELL", stop_price=takeprofit_price, price=takeprofit_price, quantity=entry_size)
+                        sleep(1)
+                        logging.info("%s", takeprofit_order, extra=log_ctx)
+                        takeprofit_order_id = takeprofit_order['orderId']
+
+                    except Exception as e:
+                        logging.error("Something went wrong executing TAKEPROFIT ORDER, error: %s", e, extra=log_ctx)
+                        order_reconciler.release(symbol, wake=True)
+                        continue
                 
-                except Exception as e:
-                    logging.error(f"Failed to log STOPLOSS trade to Supabase: {e}")
-
-                # Log TP into DB 
-
-                data = {
-                    "group_id": group_id,
-                    "order_id": takeprofit_order_id,
-                    "type": "TP",
-                    "direction": "LONG",
-                    "breakeven_threshold": 0.00,
-                    "breakeven_price": 0.00
-                }
-                try:
-                    log_into_supabase(data, supabase_url=supabase_url, api_key=supabase_api_key, jwt=supbase_jwt)
-                    logging.info("TAKEPROFIT Trade logged to Supabase")
+                    # Log TP into DB 
+
+                    data = {
+                        "group_id": group_id,
+                        "order_id": takeprofit_order_id,
+                        "type": "TP",
+                        "direction": "LONG",
+                        "breakeven_threshold": 0.00,
+                        "breakeven_price": 0.00
+                    }
+                    try:
+                        log_into_supabase(data, supabase_url=supabase_url, api_key=supabase_api_key, jwt=supbase_jwt)
+                        logging.info("TAKEPROFIT Trade logged to Supabase", extra=log_ctx)
                 
-                except Exception as e:
-                    logging.error(f"Failed to log TAKEPROFIT trade to Supabase: {e}")
+                    except Exception as e:
+                        logging.error("Failed to log TAKEPROFIT trade to Supabase: %s", e, extra=log_ctx)
+                    order_reconciler.release(symbol)
 
             
-            elif strategy_condition_short:
-
-                if (last_close - sma) < 0.5: ## this ensures that there is a reasonable gap between the SMA (TP) and the entry price, such that it will not enter if we are too close to TP 
-                    continue
-
-                logging.info("Close price higher than upper bollinger band ... Entering SHORT")
-                logging.info(f"Close price: {last_close}")
-                logging.info(f"Upper bollinger band: {bb['upper']}")
-
-                try: 
-                    logging.info(f"Quantity: {sol_entry_size}")
-                    market_in = trade.place_market_order(symbol=symbol, side = "SELL", quantity=sol_entry_size)
-                    market_in_order_id = market_in['orderId']
+                elif strategy_condition_short:
+
+                    if (last_close - float(sma)) < last_close * min_tp_gap_percentage / 100: ## this ensures that there is a reasonable gap between the SMA (TP) and the entry price, such that it will not enter if we are too close to TP 
+                        continue
+
+                    logging.info("Close price higher than upper bollinger band ... Entering SHORT", extra=log_ctx)
+                    logging.info("Close price: %s", last_close, extra=log_ctx)
+                    logging.info("Upper bollinger band: %s", bb['upper'], extra=log_ctx)
+
+                    projected_risk = portfolio_risk.projected_percentage(symbol, -float(entry_size), last_close, last_close + (last_close * sl_percentage / 100))
+                    if projected_risk >= portfolio_threshold:
+                        logging.info("Entry would lift portfolio risk to %s percent, threshold: %s", projected_risk, portfolio_threshold, extra=log_ctx)
+                        continue
+
+                    with entry_lock:
+                        group_id = get_latest_group_id(supabase_url=supabase_url, api_key=supabase_api_key, jwt=supbase_jwt) + 1
+                        log_ctx = {"symbol": symbol, "group_id": group_id}
+                        order_reconciler.hold(symbol)
+                        try: 
+                            logging.info("Quantity: %s", entry_size, extra=log_ctx)
+                            market_in = trade.place_market_order(symbol=symbol, side = "SELL", quantity=entry_size)
+                            market_in_order_id = market_in['orderId']
                 
-                except Exception as e:
-                    logging.error(f"Something went wrong executing MARKET IN ORDER, error: {e}")
-                    return e
+                        except Exception as e:
+                            logging.error("Something went wrong executing MARKET IN ORDER, error: %s", e, extra=log_ctx)
+                            order_reconciler.release(symbol, wake=True)
+                            continue
                 
-                # Log into DB 
-                data = {
-                    "group_id": group_id,
-                    "order_id": market_in_order_id,
-                    "type": "MO",
-                    "direction": "SHORT",
-                    "breakeven_threshold": 0.00,
-                    "breakeven_price": 0.00
-                }
-                try:
-                    log_into_supabase(data, supabase_url=supabase_url, api_key=supabase_api_key, jwt=supbase_jwt)
-                    logging.info("MARKET IN Trade logged to Supabase")
+                        # Log into DB 
+                        data = {
+                            "group_id": group_id,
+                            "order_id": market_in_order_id,
+                            "type": "MO",
+                            "direction": "SHORT",
+                            "breakeven_threshold": 0.00,
+                            "breakeven_price": 0.00
+                        }
+                        try:
+                            log_into_supabase(data, supabase_url=supabase_url, api_key=supabase_api_key, jwt=supbase_jwt)
+                            logging.info("MARKET IN Trade logged to Supabase", extra=log_ctx)
                 
-                except Exception as e:
-                    logging.error(f"Failed to log MARKET IN trade to Supabase: {e}")
+                        except Exception as e:
+                            logging.error("Failed to log MARKET IN trade to Supabase: %s", e, extra=log_ctx)
 
-                sleep(2)
-                actual_entry_price = binance.entry_price(market_in_order_id)
+                    sleep(2)
+                    actual_entry_price = binance.entry_price(market_in_order_id, symbol=symbol)
                 
-                stoploss_price = round(actual_entry_price + (actual_entry_price * sl_percentage / 100),2)
-                takeprofit_price = sma
-
-                try:
-                    stoploss_order = trade.set_stop_loss(symbol=symbol, side="BUY", stop_price=stoploss_price, quantity=sol_entry_size)
-                    stoploss_order_id = stoploss_order['orderId']
-
-                except Exception as e:
-                    logging.error(f"Something went wrong executing STOPLOSS ORDER, error: {e}")
-                    return e
+                    stoploss_price = exchange_info.round_price(symbol, actual_entry_price + (actual_entry_price * sl_percentage / 100))
+                    takeprofit_price = sma
+
+                    try:
+                        stoploss_order = trade.set_stop_loss(symbol=symbol, side="BUY", stop_price=stoploss_price, quantity=entry_size)
+                        stoploss_order_id = stoploss_order['orderId']
+                        portfolio_risk.upsert(stoploss_order_id, symbol, -float(entry_size), actual_entry_price, float(stoploss_price))
+
+                    except Exception as e:
+                        logging.error("Something went wrong executing STOPLOSS ORDER, error: %s", e, extra=log_ctx)
+                        order_reconciler.release(symbol, wake=True)
+                        continue
                 
-                try:
-                    takeprofit_order = trade.set_take_profit_limit(symbol=symbol, side="BUY", stop_price=takeprofit_price, price=takeprofit_price, quantity=sol_entry_size)
-                    takeprofit_order_id = takeprofit_order['orderId']
+                    # Breakeven calculations
+                    breakeven_price = exchange_info.round_price(symbol, actual_entry_price - (actual_entry_price * fee / 100))
+                    breakeven_indicator = float(breakeven_price) * (1 - breakeven_buffer_percentage / 100)
+
+                    # Log SL into DB 
+                    data = {
+                        "group_id": group_id,
+                        "order_id": stoploss_order_id,
+                        "type": "SL",
+                        "direction": "SHORT",
+                        "breakeven_threshold": breakeven_indicator,
+                        "breakeven_price": float(breakeven_price)
+                    }
+                    try:
+                        log_into_supabase(data, supabase_url=supabase_url, api_key=supabase_api_key, jwt=supbase_jwt)
+                        logging.info("STOPLOSS Trade logged to Supabase", extra=log_ctx)
                 
-                except Exception as e:
-                    logging.error(f"Something went wrong executing TAKEPROFIT ORDER, error: {e}")
-                    return e
+                    except Exception as e:
+                        logging.error("Failed to log STOPLOSS trade to Supabase: %s", e, extra=log_ctx)
+
+                    breakeven_manager.add({
+                        "group_id": group_id,
+                        "symbol": symbol,
+                        "direction": "SHORT",
+                        "order_id": stoploss_order_id,
+                        "quantity": entry_size,
+                        "entry_price": actual_entry_price,
+                        "breakeven_threshold": breakeven_indicator,
+                        "breakeven_price": breakeven_price
+                    })
+
+                    try:
+                        takeprofit_order = trade.set_take_profit_limit(symbol=symbol, side="BUY", stop_price=takeprofit_price, price=takeprofit_price, quantity=entry_size)
+                        takeprofit_order_id = takeprofit_order['orderId']
                 
-                # Breakeven calculations
-                breakeven_price = round(actual_entry_price - (actual_entry_price * fee / 100),2)
-                breakeven_indicator = breakeven_price - breakeven_buffer 
-
-                # Log SL into DB 
-                # Log SL into DB 
-                data = {
-                    "group_id": group_id,
-                    "order_id": stoploss_order_id,
-                    "type": "SL",
-                    "direction": "SHORT",
-                    "breakeven_threshold": breakeven_indicator,
-                    "breakeven_price": breakeven_price
-                }
-                try:
-                    log_into_supabase(data, supabase_url=supabase_url, api_key=supabase_api_key, jwt=supbase_jwt)
-                    logging.info("STOPLOSS Trade logged to Supabase")
+                    except Exception as e:
+                        logging.error("Something went wrong executing TAKEPROFIT ORDER, error: %s", e, extra=log_ctx)
+                        order_reconciler.release(symbol, wake=True)
+                        continue
                 
-                except Exception as e:
-                    logging.error(f"Failed to log STOPLOSS trade to Supabase: {e}")
-
-                # Log TP into DB 
-
-                data = {
-                    "group_id": group_id,
-                    "order_id": takeprofit_order_id,
-                    "type": "TP",
-                    "direction": "SHORT",
-                    "breakeven_threshold": 0.00,
-                    "breakeven_price": 0.00
-                }
-                try:
-                    log_into_supabase(data, supabase_url=supabase_url, api_key=supabase_api_key, jwt=supbase_jwt)
-                    logging.info("TAKEPROFIT Trade logged to Supabase")
+                    # Log TP into DB 
+
+                    data = {
+                        "group_id": group_id,
+                        "order_id": takeprofit_order_id,
+                        "type": "TP",
+                        "direction": "SHORT",
+                        "breakeven_threshold": 0.00,
+                        "breakeven_price": 0.00
+                    }
+                    try:
+                        log_into_supabase(data, supabase_url=supabase_url, api_key=supabase_api_key, jwt=supbase_jwt)
+                        logging.info("TAKEPROFIT Trade logged to Supabase", extra=log_ctx)
                 
-                except Exception as e:
-                    logging.error(f"Failed to log TAKEPROFIT trade to Supabase: {e}")
-
-            else: 
-                logging.info('Price within bands no entry')
-        
-asyncio.run(main())
\ No newline at end of file
+                    except Exception as e:
+                        logging.error("Failed to log TAKEPROFIT trade to Supabase: %s", e, extra=log_ctx)
+                    order_reconciler.release(symbol)
+
+                else: 
+                    logging.info('Price within bands no entry', extra=log_ctx)
+
+        except Exception:
+            # one bad candle (network error, missing fill) must not end this symbol's thread, and with it the process
+            logging.exception("🔥 Unexpected error handling %s candle:", symbol, extra={"symbol": symbol})
+            order_reconciler.release(symbol, wake=True)
+
+
+async def run_in_own_loop(coro, name):
+    """
+    Run a coroutine on its own thread and event loop and await its result from the calling loop.
+    trade_symbol blocks (REST calls with retries, sleeps between legs), so symbols sharing one loop
+    would stall each other's candle streams while one of them is placing orders.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def target():
+        try:
+            result = asyncio.run(coro)
+        except Exception as e:
+            loop.call_soon_threadsafe(future.set_exception, e)
+        else:
+            loop.call_soon_threadsafe(future.set_result, result)
+
+    threading.Thread(target=target, name=name, daemon=True).start()
+    return await future
+
+async def run(config):
+    supabase = {
+        "supabase_url": os.getenv("SUPABASE_URL"),
+        "api_key": os.getenv("SUPABASE_API_KEY"),
+        "jwt": os.getenv("SUPABASE_JWT"),
+    }
+
+    trade = execute.BinanceFuturesTrader()
+    exchange_info = ExchangeInfoCache(path=config.exchange_info_file)
+    portfolio_risk = PortfolioRisk(fee=config.strategy.fee)
+    breakeven_manager = BreakevenManager(trade, on_amended=partial(on_breakeven_amended, supabase=supabase, portfolio_risk=portfolio_risk),
+                                         fetch_order_groups=partial(get_bracket_rows, **supabase))
+    order_reconciler = OrderReconciler(trade, config.symbols, config.strategy.sl_percentage, exchange_info,
+                                       fetch_order_groups=partial(get_bracket_rows, **supabase),
+                                       log_order=partial(log_into_supabase, **supabase), portfolio_risk=portfolio_risk,
+                                       breakeven_manager=breakeven_manager)
+
+    # Warm every connection concurrently: exchange filters, the python-binance client (pings on construction)
+    # and candle history for each symbol and timeframe.
+    history_keys = [(symbol, interval) for symbol in config.symbols for interval in [config.interval, *config.higher_intervals]]
+    _, _, *histories = await asyncio.gather(
+        asyncio.to_thread(exchange_info.load),
+        asyncio.to_thread(binance.get_client),
+        *(asyncio.to_thread(indicator.CandleCache().fetch_historical_data, symbol=symbol, interval=interval, limit=config.history_limit)
+          for symbol, interval in history_keys),
+    )
+    unknown = [symbol for symbol in config.symbols if symbol not in exchange_info.symbols]
+    if unknown:
+        raise ValueError(f"Unknown or untradeable symbol(s) in config: {', '.join(unknown)}")
+    histories = dict(zip(history_keys, histories))
+    caches = {symbol: indicator.CandleCache(historical_data=histories[(symbol, config.interval)]) for symbol in config.symbols}
+
+    # One base stream per symbol feeds every higher timeframe
+    resamplers = {}
+    for symbol in config.symbols:
+        resampler = resamplers[symbol] = CandleResampler(config.interval, config.higher_intervals)
+        for interval in config.higher_intervals:
+            resampler.load_history(interval, histories[(symbol, interval)])
+        resampler.replay(histories[(symbol, config.interval)])
+
+    exchange_info.start_refresh()
+    breakeven_manager.start(config.symbols)
+    order_reconciler.start()
+
+    entry_lock = threading.Lock()
+    await asyncio.gather(*(
+        run_in_own_loop(trade_symbol(symbol, caches[symbol], resamplers[symbol], config, trade, exchange_info, breakeven_manager,
+                                     order_reconciler, portfolio_risk, supabase, entry_lock), name=f"strategy-{symbol}")
+        for symbol in config.symbols
+    ))
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Bollinger band + RSI mean reversion bot for Binance USDT-M futures")
+    parser.add_argument("-c", "--config", help="TOML or YAML config file (defaults to the built-in strategy parameters)")
+    parser.add_argument("--env-file", default=".env", help="dotenv file with API keys and Supabase credentials")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    from dotenv import load_dotenv
+    load_dotenv(args.env_file)
+    config = load_config(args.config)
+    strategy_env()  # fail now rather than at the first candle's Supabase call
+    init_logger(config.log_file)
+    logging.info("Starting %s on %s", config.interval, ", ".join(config.symbols))
+    asyncio.run(run(config))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+import asyncio
+from decimal import Decimal
+
+from utils.breakeven_manager import BreakevenManager
+
+
+class FakeTrader:
+    """ Records calls; set_stop_loss answers from `placements` in order, then keeps answering with the last one. """
+
+    def __init__(self, placements=None, cancel=None):
+        self.placements = list(placements or [{'orderId': 99}])
+        self.cancel = cancel if cancel is not None else (lambda order_id: {'orderId': order_id})
+        self.cancelled = []
+        self.placed = []
+
+    def cancel_order(self, symbol, order_id):
+        self.cancelled.append(order_id)
+        return self.cancel(order_id)
+
+    def set_stop_loss(self, **kwargs):
+        self.placed.append(kwargs)
+        return self.placements.pop(0) if len(self.placements) > 1 else self.placements[0]
+
+
+class FakeReconciler:
+    def __init__(self):
+        self.holds = {}
+        self.released = []
+
+    def hold(self, symbol, owner="entry"):
+        self.holds.setdefault(symbol, set()).add(owner)
+
+    def release(self, symbol, owner="entry", wake=False):
+        self.holds.get(symbol, set()).discard(owner)
+        self.released.append((symbol, owner, wake))
+
+
+def bracket(group_id=1, symbol="SOLUSDT", direction="LONG", threshold=101.0, order_id=None):
+    return {
+        "group_id": group_id,
+        "symbol": symbol,
+        "direction": direction,
+        "order_id": order_id or group_id * 10,
+        "quantity": Decimal("2"),
+        "entry_price": 100.0,
+        "breakeven_threshold": threshold,
+        "breakeven_price": Decimal("100.1"),
+    }
+
+
+def manager(trader=None, **kwargs):
+    m = BreakevenManager(trader or FakeTrader(), **kwargs)
+    m.retry_delay = 0.001
+    m.cooldown = 0.001
+    return m
+
+
+def test_long_triggers_when_bid_reaches_threshold():
+    m = manager()
+    m.add(bracket(1, threshold=101.0))
+    m.add(bracket(2, threshold=102.0))
+
+    assert m.pop_triggered("SOLUSDT", bid=100.9, ask=101.0) == []
+    assert [b['group_id'] for b in m.pop_triggered("SOLUSDT", bid=101.0, ask=101.1)] == [1]
+    assert [b['group_id'] for b in m.pop_triggered("SOLUSDT", bid=105.0, ask=105.1)] == [2]
+    assert m.brackets == {}
+
+
+def test_short_triggers_when_ask_falls_to_threshold():
+    m = manager()
+    m.add(bracket(1, direction="SHORT", threshold=99.0))
+    m.add(bracket(2, direction="SHORT", threshold=98.0))
+
+    assert m.pop_triggered("SOLUSDT", bid=98.9, ask=99.1) == []
+    assert [b['group_id'] for b in m.pop_triggered("SOLUSDT", bid=98.8, ask=99.0)] == [1]
+    assert [b['group_id'] for b in m.pop_triggered("SOLUSDT", bid=90.0, ask=90.1)] == [2]
+
+
+def test_other_symbols_are_not_triggered():
+    m = manager()
+    m.add(bracket(1, symbol="BTCUSDT", threshold=101.0))
+    assert m.pop_triggered("SOLUSDT", bid=200.0, ask=200.0) == []
+    assert list(m.brackets) == [1]
+
+
+def test_remove_drops_bracket_from_index():
+    m = manager()
+    m.add(bracket(1, threshold=101.0))
+    m.add(bracket(2, threshold=101.0))
+
+    assert m.remove(1)['group_id'] == 1
+    assert m.remove(1) is None
+    assert m.long_index["SOLUSDT"] == [(101.0, 2)]
+
+
+def test_remove_symbol_by_group_or_order():
+    m = manager()
+    m.add(bracket(1, order_id=11))
+    m.add(bracket(2, order_id=12))
+    m.add(bracket(3, order_id=13))
+    m.add(bracket(4, symbol="BTCUSDT"))
+
+    assert [b['group_id'] for b in m.remove_symbol("SOLUSDT", group_ids={1}, order_ids={13})] == [1, 3]
+    assert sorted(m.brackets) == [2, 4]
+    assert [b['group_id'] for b in m.remove_symbol("SOLUSDT")] == [2]
+    assert list(m.brackets) == [4]
+
+
+def test_amend_places_reduce_only_sl_and_releases_hold():
+    trader = FakeTrader()
+    amended = []
+    m = manager(trader, on_amended=lambda b, sl: amended.append((b['group_id'], sl['orderId'])))
+    m.reconciler = reconciler = FakeReconciler()
+
+    assert asyncio.run(m.amend_stop_loss(bracket(1))) == {'orderId': 99}
+    assert trader.cancelled == [10]
+    assert trader.placed[0]['reduce_only'] is True
+    assert trader.placed[0]['stop_price'] == Decimal("100.1")
+    assert amended == [(1, 99)]
+    assert reconciler.holds["SOLUSDT"] == set()
+
+
+def test_rejected_placement_retries_placement_only():
+    trader = FakeTrader(placements=[{'code': -2021}, {'code': -2021}, {'orderId': 99}])
+    amended = []
+    m = manager(trader, on_amended=lambda b, sl: amended.append(sl['orderId']))
+    m.reconciler = reconciler = FakeReconciler()
+
+    async def run():
+        assert await m.amend_stop_loss(bracket(1)) is None
+        assert reconciler.holds["SOLUSDT"] == {"breakeven-1"}  # held while retrying
+        await asyncio.gather(*m._tasks)
+
+    asyncio.run(run())
+    assert trader.cancelled == [10]
+    assert len(trader.placed) == 3
+    assert amended == [99]
+    assert 1 not in m.brackets and m._pending == {}
+    assert reconciler.holds["SOLUSDT"] == set()
+
+
+def test_retry_gives_up_after_max_retries():
+    trader = FakeTrader(placements=[{'code': -2021}])
+    m = manager(trader)
+    m.max_retries = 3
+    m.reconciler = reconciler = FakeReconciler()
+
+    async def run():
+        await m.amend_stop_loss(bracket(1))
+        await asyncio.gather(*m._tasks)
+
+    asyncio.run(run())
+    assert len(trader.placed) == 1 + 3
+    assert m._pending == {}
+    assert reconciler.released[-1] == ("SOLUSDT", "breakeven-1", True)
+
+
+def test_retry_stops_once_bracket_is_removed():
+    trader = FakeTrader(placements=[{'code': -2021}])
+    m = manager(trader)
+    m.retry_delay = 0.05
+
+    async def run():
+        await m.amend_stop_loss(bracket(1))
+        m.remove_symbol("SOLUSDT")
+        await asyncio.gather(*m._tasks)
+
+    asyncio.run(run())
+    assert len(trader.placed) == 1
+
+
+def test_failed_cancel_and_placement_rearms_after_cooldown():
+    trader = FakeTrader(placements=[{'code': -2021}], cancel=lambda order_id: {'code': -2011})
+    m = manager(trader)
+
+    async def run():
+        await m.amend_stop_loss(bracket(1))
+        assert 1 not in m.brackets  # not re-armed on the next tick
+        await asyncio.gather(*m._tasks)
+
+    asyncio.run(run())
+    assert trader.cancelled == [10]
+    assert len(trader.placed) == 1
+    assert m.long_index["SOLUSDT"] == [(101.0, 1)]
+
+
+def test_seed_rearms_open_sl_with_breakeven_row():
+    class SeedTrader(FakeTrader):
+        def get_open_orders(self):
+            return [
+                {'orderId': 10, 'symbol': 'SOLUSDT', 'type': 'STOP_MARKET', 'origQty': '2.5', 'executedQty': '0'},
+                {'orderId': 11, 'symbol': 'SOLUSDT', 'type': 'TAKE_PROFIT', 'origQty': '2.5', 'executedQty': '0'},
+                {'orderId': 20, 'symbol': 'BTCUSDT', 'type': 'STOP_MARKET', 'origQty': '1', 'executedQty': '0'},
+            ]
+
+        def get_position_risk(self):
+            return [{'symbol': 'SOLUSDT', 'positionAmt': '2.5', 'entryPrice': '100'},
+                    {'symbol': 'BTCUSDT', 'positionAmt': '1', 'entryPrice': '60000'}]
+
+    rows = [
+        {'group_id': 1, 'order_id': 10, 'type': 'SL', 'direction': 'LONG', 'breakeven_threshold': 100.12, 'breakeven_price': 100.1},
+        {'group_id': 2, 'order_id': 20, 'type': 'SL', 'direction': 'LONG', 'breakeven_threshold': 0, 'breakeven_price': 0},
+    ]
+    m = manager(SeedTrader(), fetch_order_groups=lambda order_ids: rows)
+
+    assert m.seed(["SOLUSDT", "BTCUSDT"]) == 1
+    seeded = m.brackets[1]
+    assert seeded['quantity'] == Decimal("2.5")
+    assert seeded['breakeven_price'] == Decimal("100.1")
+    assert seeded['entry_price'] == 100.0
+    assert m.long_index["SOLUSDT"] == [(100.12, 1)]
@@ -0,0 +1,167 @@
+from decimal import Decimal
+
+from utils.breakeven_manager import BreakevenManager
+from utils.exchange_info import ExchangeInfoCache
+from utils.order_reconciler import OrderReconciler
+from utils.portfolio_risk import PortfolioRisk
+
+
+class FakeTrader:
+    def __init__(self, positions=(), open_orders=()):
+        self.positions = list(positions)
+        self.open_orders = list(open_orders)
+        self.cancelled_all = []
+        self.cancelled = []
+        self.placed = []
+
+    def get_position_risk(self):
+        return self.positions
+
+    def get_open_orders(self):
+        return self.open_orders
+
+    def get_usdt_balance(self):
+        return 1000.0
+
+    def cancel_all_open_orders(self, symbol):
+        self.cancelled_all.append(symbol)
+
+    def cancel_batch_orders(self, symbol, order_ids):
+        self.cancelled.extend(order_ids)
+
+    def place_batch_orders(self, orders):
+        self.placed.extend(orders)
+        return [{'orderId': 500 + i} for i in range(len(orders))]
+
+
+def exchange_info():
+    cache = ExchangeInfoCache(path="unused.json")
+    cache._apply({'fetched_at': 0, 'symbols': [{'symbol': 'SOLUSDT', 'filters': [
+        {'filterType': 'PRICE_FILTER', 'tickSize': '0.0100'},
+        {'filterType': 'LOT_SIZE', 'stepSize': '0.01', 'minQty': '0.01'},
+        {'filterType': 'MARKET_LOT_SIZE', 'stepSize': '0.01'},
+    ]}]})
+    return cache
+
+
+def position(amount, entry=100.0, mark=100.0):
+    return {'symbol': 'SOLUSDT', 'positionAmt': str(amount), 'entryPrice': str(entry), 'markPrice': str(mark)}
+
+
+def leg(order_id, type_, side="SELL", qty="2", stop="95", time=0):
+    return {'orderId': order_id, 'symbol': 'SOLUSDT', 'type': type_, 'side': side, 'origQty': qty,
+            'executedQty': '0', 'stopPrice': stop, 'time': time}
+
+
+GROUPS = [
+    {'group_id': 7, 'order_id': 70, 'type': 'SL', 'direction': 'LONG'},
+    {'group_id': 7, 'order_id': 71, 'type': 'TP', 'direction': 'LONG'},
+]
+
+
+def reconciler(trader, groups=GROUPS, **kwargs):
+    logged = []
+    r = OrderReconciler(trader, ["SOLUSDT"], sl_percentage=0.5, exchange_info=exchange_info(),
+                        fetch_order_groups=lambda order_ids: [g for g in groups], log_order=logged.append, **kwargs)
+    r.set_take_profit_price("SOLUSDT", Decimal("110.00"))
+    return r, logged
+
+
+def test_flat_position_cancels_legs_and_drops_state():
+    trader = FakeTrader([position(0)], [leg(70, 'STOP_MARKET'), leg(71, 'TAKE_PROFIT')])
+    risk = PortfolioRisk()
+    risk.upsert(70, "SOLUSDT", 2, 100, 95)
+    breakeven = BreakevenManager(trader)
+    breakeven.add({"group_id": 7, "symbol": "SOLUSDT", "direction": "LONG", "order_id": 70, "quantity": Decimal("2"),
+                   "entry_price": 100.0, "breakeven_threshold": 101.0, "breakeven_price": Decimal("100.1")})
+    r, _ = reconciler(trader, portfolio_risk=risk, breakeven_manager=breakeven)
+
+    r.reconcile()
+    assert trader.cancelled_all == ["SOLUSDT"]
+    assert len(risk) == 0
+    assert breakeven.brackets == {}
+
+
+def test_fully_covered_position_is_left_alone():
+    trader = FakeTrader([position(2)], [leg(70, 'STOP_MARKET'), leg(71, 'TAKE_PROFIT', stop="110")])
+    r, logged = reconciler(trader)
+
+    r.reconcile()
+    assert trader.cancelled == [] and trader.placed == [] and logged == []
+
+
+def test_leg_whose_sibling_filled_is_cancelled():
+    # TP 71 still open, its SL 70 is gone: the bracket is half closed, so the TP is stale
+    trader = FakeTrader([position(2)], [leg(71, 'TAKE_PROFIT', stop="110")])
+    r, _ = reconciler(trader)
+
+    r.reconcile()
+    assert trader.cancelled == [71]
+
+
+def test_wrong_side_leg_is_stale():
+    r, _ = reconciler(FakeTrader())
+    stale = r._find_stale_legs([leg(70, 'STOP_MARKET', side="BUY"), leg(71, 'TAKE_PROFIT')], "SELL", GROUPS)
+    assert [o['orderId'] for o in stale] == [70]
+
+
+def test_unknown_leg_only_shields_the_other_leg_type():
+    groups = GROUPS + [
+        {'group_id': 8, 'order_id': 80, 'type': 'SL', 'direction': 'LONG'},
+        {'group_id': 8, 'order_id': 81, 'type': 'TP', 'direction': 'LONG'},
+    ]
+    r, _ = reconciler(FakeTrader())
+    # 90 is an SL not in order_groups (e.g. a breakeven replacement): TP 71 may be its sibling, SL 80 is judged
+    legs = [leg(71, 'TAKE_PROFIT'), leg(80, 'STOP_MARKET'), leg(90, 'STOP_MARKET')]
+    assert [o['orderId'] for o in r._find_stale_legs(legs, "SELL", groups)] == [80]
+
+
+def test_missing_sl_is_placed_reduce_only_and_logged_to_own_group():
+    trader = FakeTrader([position(2.005, entry=100.0)], [leg(71, 'TAKE_PROFIT', qty="2.005", stop="110")])
+    # the TP's sibling SL has no row yet, so keep the SL row out of the groups to avoid a stale verdict
+    r, logged = reconciler(trader, groups=[GROUPS[1]])
+
+    r.reconcile()
+    assert trader.cancelled == []
+    [sl] = trader.placed
+    assert sl['type'] == 'STOP_MARKET' and sl['reduceOnly'] == 'true'
+    assert sl['quantity'] == Decimal("2.00")       # floored to the market step
+    assert sl['stopPrice'] == Decimal("99.50")     # entry - 0.5%, on the tick
+    assert [(row['group_id'], row['order_id'], row['type']) for row in logged] == [(7, 500, "SL")]
+
+
+def test_repairs_without_a_known_group_are_not_logged():
+    trader = FakeTrader([position(-2)], [])
+    r, logged = reconciler(trader, groups=[])
+
+    r.reconcile()
+    assert [(o['type'], o['side'], o['reduceOnly']) for o in trader.placed] == [
+        ('STOP_MARKET', 'BUY', 'true'), ('TAKE_PROFIT', 'BUY', 'true')]
+    assert logged == []
+
+
+def test_portfolio_risk_is_resynced_from_live_stops():
+    trader = FakeTrader([position(2, mark=101.0)], [leg(70, 'STOP_MARKET', stop="97"), leg(71, 'TAKE_PROFIT', stop="110")])
+    risk = PortfolioRisk(fee=0)
+    r, _ = reconciler(trader, portfolio_risk=risk)
+
+    r.reconcile()
+    assert risk.balance == 1000.0
+    assert risk.snapshot()["dollar_at_risk"] == 2 * (100 - 97)
+
+
+def test_held_symbol_is_skipped_until_every_owner_releases():
+    trader = FakeTrader([position(2)], [])
+    r, _ = reconciler(trader)
+
+    r.hold("SOLUSDT")
+    r.hold("SOLUSDT", owner="breakeven-7")
+    r.reconcile()
+    r.release("SOLUSDT")
+    r.reconcile()
+    assert trader.placed == []
+
+    r.release("SOLUSDT", owner="breakeven-7")
+    r.release("SOLUSDT", owner="breakeven-7")  # releasing twice is harmless
+    r.reconcile()
+    assert len(trader.placed) == 2
@@ -0,0 +1,124 @@
+import math
+
+import numpy as np
+import pytest
+
+from utils.portfolio_risk import PortfolioRisk
+
+
+def walk(seed, n=60):
+    rng = np.random.default_rng(seed)
+    return np.cumprod(1 + rng.normal(0, 0.01, n)) * 100
+
+
+def test_risk_is_stop_loss_plus_fees_for_both_directions():
+    risk = PortfolioRisk(fee=0.1)
+    risk.upsert("long", "SOLUSDT", 2, 100, 95)
+    risk.upsert("short", "BTCUSDT", -1, 200, 210)
+    risk.upsert("trailing", "ETHUSDT", 1, 100, 101)  # stop already past entry: only fees at risk
+
+    per_symbol = risk.snapshot()["per_symbol_risk"]
+    assert per_symbol["SOLUSDT"] == pytest.approx(2 * 5 + 2 * 100 * 0.001)
+    assert per_symbol["BTCUSDT"] == pytest.approx(10 + 200 * 0.001)
+    assert per_symbol["ETHUSDT"] == pytest.approx(100 * 0.001)
+
+
+def test_remove_compacts_slots_and_keeps_keys_consistent():
+    risk = PortfolioRisk(fee=0, capacity=2)  # also forces a grow
+    for i, stop in enumerate([99, 98, 97]):
+        risk.upsert(i, "SOLUSDT", 1, 100, stop)
+
+    risk.remove(0)
+    risk.remove(0)  # unknown keys are ignored
+    assert len(risk) == 2
+    assert {key: risk.stop[slot] for key, slot in risk.keys.items()} == {1: 98, 2: 97}
+    assert [risk.keys[key] for key in risk.slot_keys] == [0, 1]
+    assert risk.snapshot()["dollar_at_risk"] == pytest.approx(2 + 3)
+
+
+def test_upsert_updates_existing_key_in_place():
+    risk = PortfolioRisk(fee=0)
+    risk.upsert("sl", "SOLUSDT", 2, 100, 95)
+    risk.upsert("sl", "SOLUSDT", 2, 100, 99)
+    assert len(risk) == 1
+    assert risk.snapshot()["dollar_at_risk"] == pytest.approx(2)
+
+
+def test_replace_symbol_only_touches_that_symbol():
+    risk = PortfolioRisk(fee=0)
+    risk.upsert("a", "SOLUSDT", 1, 100, 95)
+    risk.upsert("b", "BTCUSDT", 1, 100, 90)
+    risk.upsert("c", "SOLUSDT", 1, 100, 96)
+
+    risk.replace_symbol("SOLUSDT", [("d", 3, 100, 99)])
+    assert sorted(risk.keys) == ["b", "d"]
+    assert risk.snapshot()["per_symbol_risk"] == {"SOLUSDT": pytest.approx(3), "BTCUSDT": pytest.approx(10)}
+
+
+def test_update_mark_for_a_new_symbol():
+    risk = PortfolioRisk()
+    risk.update_mark("SOLUSDT", 150.0)
+    risk.update_mark("BTCUSDT", 60000.0)
+    assert risk.marks[risk.symbols["SOLUSDT"]] == 150.0
+    assert risk.marks[risk.symbols["BTCUSDT"]] == 60000.0
+
+
+def test_hedge_without_measured_correlation_does_not_cancel():
+    risk = PortfolioRisk(fee=0)
+    risk.upsert(1, "SOLUSDT", 1, 100, 95)
+    risk.upsert(2, "BTCUSDT", -1, 100, 105)
+    assert risk.snapshot()["correlated_risk"] == pytest.approx(10)
+
+
+def test_measured_hedge_offsets_but_not_below_largest_symbol_risk():
+    risk = PortfolioRisk(fee=0)
+    closes = walk(0)
+    risk.update_returns("SOLUSDT", closes)
+    risk.update_returns("BTCUSDT", closes * 2)  # identical returns: correlation 1
+    risk.upsert(1, "SOLUSDT", 1, 100, 95)
+    risk.upsert(2, "BTCUSDT", -1, 100, 103)
+    assert risk.snapshot()["correlated_risk"] == pytest.approx(5)
+
+
+def test_same_direction_correlated_positions_add_up():
+    risk = PortfolioRisk(fee=0)
+    closes = walk(0)
+    risk.update_returns("SOLUSDT", closes)
+    risk.update_returns("BTCUSDT", closes * 2)
+    risk.upsert(1, "SOLUSDT", 1, 100, 95)
+    risk.upsert(2, "BTCUSDT", 1, 100, 97)
+    assert risk.snapshot()["correlated_risk"] == pytest.approx(8)
+
+
+def test_uncorrelated_positions_combine_in_quadrature():
+    risk = PortfolioRisk(fee=0, min_returns=20)
+    a, b = walk(1, 2000), walk(2, 2000)
+    risk.update_returns("SOLUSDT", a)
+    risk.update_returns("BTCUSDT", b)
+    risk.upsert(1, "SOLUSDT", 1, 100, 97)
+    risk.upsert(2, "BTCUSDT", 1, 100, 96)
+
+    corr = np.corrcoef(np.diff(a) / a[:-1], np.diff(b) / b[:-1])[0, 1]
+    expected = math.sqrt(9 + 16 + 2 * corr * 12)
+    assert risk.snapshot()["correlated_risk"] == pytest.approx(expected)
+    assert risk.snapshot()["correlated_risk"] < 7
+
+
+def test_short_history_counts_as_fully_correlated():
+    risk = PortfolioRisk(fee=0, min_returns=20)
+    risk.update_returns("SOLUSDT", walk(1, 10))
+    risk.update_returns("BTCUSDT", walk(2, 10))
+    risk.upsert(1, "SOLUSDT", 1, 100, 97)
+    risk.upsert(2, "BTCUSDT", 1, 100, 96)
+    assert risk.snapshot()["correlated_risk"] == pytest.approx(7)
+
+
+def test_percentages_need_a_balance():
+    risk = PortfolioRisk(fee=0)
+    risk.upsert(1, "SOLUSDT", 1, 100, 95)
+    assert risk.percentage_at_risk() is None
+
+    risk.set_balance(1000)
+    assert risk.percentage_at_risk() == 0.5
+    assert risk.projected_percentage("BTCUSDT", -2, 50, 52.5) == 1.0
+    assert len(risk) == 1  # projection does not add the position
@@ -0,0 +1,82 @@
+import pytest
+
+from utils.resampler import CandleResampler, interval_to_ms
+
+FIVE_MIN = 5 * 60_000
+HOUR = 3_600_000
+# 2024-01-01 00:00 UTC, a Monday
+MONDAY = 1_704_067_200_000
+
+
+def candle(open_time, open_=1.0, high=2.0, low=0.5, close=1.5, volume=10.0, interval_ms=FIVE_MIN):
+    return {'timestamp': open_time, 'open': open_, 'high': high, 'low': low, 'close': close,
+            'volume': volume, 'close_time': open_time + interval_ms - 1}
+
+
+def test_interval_to_ms():
+    assert interval_to_ms("5m") == FIVE_MIN
+    assert interval_to_ms("4h") == 4 * HOUR
+    assert interval_to_ms("1w") == 7 * 24 * HOUR
+    for bad in ("1M", "5x", "m", "1.5h"):
+        with pytest.raises(ValueError):
+            interval_to_ms(bad)
+
+
+def test_rejects_intervals_that_are_not_multiples():
+    with pytest.raises(ValueError):
+        CandleResampler("5m", ["7m"])
+    with pytest.raises(ValueError):
+        CandleResampler("5m", ["5m"])
+
+
+def test_three_5m_candles_make_one_15m_bar():
+    resampler = CandleResampler("5m", ["15m"])
+    start = MONDAY
+    assert resampler.add_candle(candle(start, open_=10, high=12, low=9, close=11, volume=1)) == []
+    assert resampler.add_candle(candle(start + FIVE_MIN, open_=11, high=15, low=10, close=14, volume=2)) == []
+    [(interval, bar)] = resampler.add_candle(candle(start + 2 * FIVE_MIN, open_=14, high=14, low=8, close=9, volume=3))
+
+    assert interval == "15m"
+    assert bar == {'timestamp': start, 'open': 10, 'high': 15, 'low': 8, 'close': 9, 'volume': 6,
+                   'close_time': start + 3 * FIVE_MIN - 1}
+    assert resampler.caches["15m"].candles[-1] is bar
+
+
+def test_buckets_align_to_exchange_boundaries():
+    resampler = CandleResampler("5m", ["1h", "1w"])
+    # a candle at Thursday 13:25 belongs to the 13:00 hour and the week starting on Monday
+    thursday = MONDAY + 3 * 24 * HOUR + 13 * HOUR + 25 * 60_000
+    assert resampler._bucket_start(thursday, HOUR) == MONDAY + 3 * 24 * HOUR + 13 * HOUR
+    assert resampler._bucket_start(thursday, interval_to_ms("1w")) == MONDAY
+
+
+def test_bar_started_mid_bucket_is_dropped():
+    resampler = CandleResampler("5m", ["15m"])
+    resampler.add_candle(candle(MONDAY + FIVE_MIN))
+    assert resampler.add_candle(candle(MONDAY + 2 * FIVE_MIN)) == []
+    assert len(resampler.caches["15m"].candles) == 0
+
+    closed = [resampler.add_candle(candle(MONDAY + i * FIVE_MIN)) for i in (3, 4, 5)]
+    assert [len(c) for c in closed] == [0, 0, 1]
+
+
+def test_bucket_missing_its_last_candle_closes_when_the_next_one_starts():
+    resampler = CandleResampler("5m", ["15m"])
+    resampler.add_candle(candle(MONDAY, volume=1))
+    resampler.add_candle(candle(MONDAY + FIVE_MIN, volume=2))
+    # MONDAY + 10m never arrives (e.g. lost in a reconnect)
+    [(_, bar)] = resampler.add_candle(candle(MONDAY + 3 * FIVE_MIN))
+    assert bar['timestamp'] == MONDAY and bar['volume'] == 3
+    assert resampler.partial["15m"]['timestamp'] == MONDAY + 3 * FIVE_MIN
+
+
+def test_replay_after_history_does_not_duplicate_bars():
+    resampler = CandleResampler("5m", ["15m"])
+    history = [candle(MONDAY + i * 3 * FIVE_MIN, interval_ms=3 * FIVE_MIN) for i in range(4)]
+    resampler.load_history("15m", history)
+    assert len(resampler.caches["15m"].candles) == 4
+
+    # base candles covering the last loaded bar and the one after it
+    base = [candle(MONDAY + i * FIVE_MIN) for i in range(9, 15)]
+    resampler.replay(base)
+    assert [c['timestamp'] for c in resampler.caches["15m"].candles] == [MONDAY + i * 3 * FIVE_MIN for i in range(5)]
@@ -1,21 +1,25 @@
-from binance.client import Client
 import logging
 import requests
 import time
 import os 
-from dotenv import load_dotenv
 
-load_dotenv()
+_client = None
 
-api_key = os.getenv('BINANCE_API_KEY')
-api_secret = os.getenv('BINANCE_API_SECRET')
-
-client = Client(api_key, api_secret)
+def get_client():
+    '''
+    Returns the shared python-binance Client, constructing it on first use.
+    Client() pings the exchange, so nothing here touches the network at import time.
+    '''
+    global _client
+    if _client is None:
+        from binance.client import Client
+        _client = Client(os.getenv('BINANCE_API_KEY'), os.getenv('BINANCE_API_SECRET'))
+    return _client
 
 def get_usdt_balance():
     while True:
         try:
-            futures_account = client.futures_account()  # USDT-margined futures
+            futures_account = get_client().futures_account()  # USDT-margined futures
             assets = futures_account['assets']
             for asset in assets:
                 if asset['asset'] == 'USDT':
@@ -30,7 +34,7 @@ def get_usdt_balance():
 def percentage_at_risk(risk_amount):
     while True:
         try:
-            positions = client.futures_account()['positions']
+            positions = get_client().futures_account()['positions']
 
             open_positions = [
                 pos for pos in positions
@@ -49,30 +53,34 @@ def percentage_at_risk(risk_amount):
             logging.warning(f"⚠️ Error fetching positions: {e}. Retrying")
             time.sleep(0.1)
 
-def entry_price(order_id):
-    while True:
+def entry_price(order_id, symbol="SOLUSDT", max_attempts=10):
+    '''
+    Volume-weighted fill price of an order. Fills can show up a moment after the order response,
+    so an order without trades yet is retried; raises ValueError if none appear.
+    '''
+    for attempt in range(1, max_attempts + 1):
         try:
-            trades = client.futures_account_trades(symbol="SOLUSDT")
+            trades = get_client().futures_account_trades(symbol=symbol)
 
             matching_trades = [t for t in trades if t['orderId'] == order_id]
 
-            if not matching_trades:
-                print("❌ No trades found for that order ID.")
-            else:
+            if matching_trades:
                 total_qty = sum(float(t['qty']) for t in matching_trades)
                 weighted_sum = sum(float(t['price']) * float(t['qty']) for t in matching_trades)
-                avg_entry_price = weighted_sum / total_qty
+                return weighted_sum / total_qty
 
-            return avg_entry_price
+            logging.warning(f"❌ [Attempt {attempt}] No trades found for order {order_id}. Retrying")
 
         except requests.exceptions.RequestException as e:
-            logging.warning(f"⚠️ Error fetching positions: {e}. Retrying")
-            time.sleep(0.1)
+            logging.warning(f"⚠️ Error fetching trades: {e}. Retrying")
+        time.sleep(0.5)
+
+    raise ValueError(f"No fills found for order {order_id} on {symbol}")
 
 def get_total_open_order():
     while True: 
         try: 
-            open_orders = client.futures_get_open_orders()
+            open_orders = get_client().futures_get_open_orders()
             return len(open_orders)
         except Exception as e: 
             logging.warning(f"⚠️ Error fetching open orders: {e}. Retrying")
@@ -80,4 +88,6 @@ def get_total_open_order():
 
 
 if __name__ == '__main__':
+    from dotenv import load_dotenv
+    load_dotenv()
     print(get_total_open_order())
\ No newline at end of file
@@ -0,0 +1,268 @@
+import asyncio
+import bisect
+import logging
+import threading
+from decimal import Decimal
+
+from utils.websocket_handler import book_ticker_stream
+
+
+class BreakevenManager:
+    """
+    Moves a bracket's stop loss to its breakeven price once the market crosses breakeven_threshold.
+
+    Brackets are kept per symbol in two lists sorted by threshold:
+      - LONG triggers when the best bid rises to/above the threshold -> prefix of the ascending list
+      - SHORT triggers when the best ask falls to/below the threshold -> suffix of the ascending list
+    so every tick is a single bisect per side instead of a scan of all open trades.
+    """
+
+    def __init__(self, trader, on_amended=None, fetch_order_groups=None):
+        self.trader = trader
+        self.on_amended = on_amended  # callback(bracket, new_sl_order), e.g. to log the new SL into Supabase
+        self.fetch_order_groups = fetch_order_groups  # (order_ids) -> order_groups rows, to seed brackets on start
+        self.brackets = {}            # group_id -> bracket dict
+        self.long_index = {}          # symbol -> sorted [(threshold, group_id)]
+        self.short_index = {}         # symbol -> sorted [(threshold, group_id)]
+        self.max_retries = 5          # placement retries after the old SL is already cancelled
+        self.retry_delay = 2          # seconds, doubled after every failed retry
+        self.cooldown = 30            # seconds before re-arming a bracket whose amend failed outright
+        self._pending = {}            # group_id -> bracket being retried / cooling down, dropped by remove()
+        self._tasks = set()           # strong refs so background retries are not garbage collected
+        self.reconciler = None        # OrderReconciler held off a symbol while its SL is being replaced
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add(self, bracket: dict):
+        """
+        Track a bracket. Expected keys: group_id, symbol, direction ("LONG"/"SHORT"), order_id (of the SL),
+        quantity, breakeven_threshold, breakeven_price.
+        """
+        index = self.long_index if bracket['direction'] == "LONG" else self.short_index
+        with self._lock:
+            self.brackets[bracket['group_id']] = bracket
+            bisect.insort(index.setdefault(bracket['symbol'], []), (bracket['breakeven_threshold'], bracket['group_id']))
+        logging.info("Tracking breakeven for group %s at threshold %s", bracket['group_id'], bracket['breakeven_threshold'],
+                     extra={"symbol": bracket['symbol'], "group_id": bracket['group_id']})
+
+    def remove(self, group_id):
+        """ Stop tracking a bracket, e.g. once its position is closed. Returns the bracket or None. """
+        with self._lock:
+            pending = self._pending.pop(group_id, None)
+            bracket = self.brackets.pop(group_id, None)
+            if bracket is None:
+                return pending
+            index = self.long_index if bracket['direction'] == "LONG" else self.short_index
+            entries = index.get(bracket['symbol'], [])
+            key = (bracket['breakeven_threshold'], group_id)
+            i = bisect.bisect_left(entries, key)
+            if i < len(entries) and entries[i] == key:
+                del entries[i]
+        return bracket
+
+    def remove_symbol(self, symbol: str, group_ids=None, order_ids=None):
+        """
+        Stop tracking a symbol's brackets: all of them, or only those in group_ids or whose SL is in order_ids.
+        Used by the reconciler once a position is flat or its legs have been cancelled. Returns the removed brackets.
+        """
+        with self._lock:
+            matched = [group_id for group_id, bracket in {**self._pending, **self.brackets}.items()
+                       if bracket['symbol'] == symbol and (
+                           (group_ids is None and order_ids is None)
+                           or group_id in (group_ids or ())
+                           or bracket['order_id'] in (order_ids or ()))]
+        removed = [bracket for bracket in map(self.remove, matched) if bracket is not None]
+        for bracket in removed:
+            logging.info("Stopped tracking breakeven for group %s", bracket['group_id'],
+                         extra={"symbol": symbol, "group_id": bracket['group_id']})
+        return removed
+
+    def pop_triggered(self, symbol: str, bid: float, ask: float):
+        """ Remove and return every bracket whose threshold has been crossed by this tick. """
+        triggered = []
+        with self._lock:
+            longs = self.long_index.get(symbol)
+            if longs and longs[0][0] <= bid:
+                cut = bisect.bisect_right(longs, (bid, float('inf')))
+                triggered.extend(longs[:cut])
+                del longs[:cut]
+
+            shorts = self.short_index.get(symbol)
+            if shorts and shorts[-1][0] >= ask:
+                cut = bisect.bisect_left(shorts, (ask, float('-inf')))
+                triggered.extend(shorts[cut:])
+                del shorts[cut:]
+
+            return [self.brackets.pop(group_id) for _, group_id in triggered]
+
+    def _hold(self, bracket: dict):
+        if self.reconciler is not None:
+            self.reconciler.hold(bracket['symbol'], owner=f"breakeven-{bracket['group_id']}")
+
+    def _release(self, bracket: dict, wake: bool = False):
+        if self.reconciler is not None:
+            self.reconciler.release(bracket['symbol'], owner=f"breakeven-{bracket['group_id']}", wake=wake)
+
+    def _place_breakeven_sl(self, bracket: dict):
+        side = "SELL" if bracket['direction'] == "LONG" else "BUY"
+        return self.trader.set_stop_loss(symbol=bracket['symbol'], side=side, stop_price=bracket['breakeven_price'],
+                                         quantity=bracket['quantity'], reduce_only=True)
+
+    async def amend_stop_loss(self, bracket: dict):
+        """
+        Cancel the old SL and place the breakeven SL concurrently, so the amend costs one round-trip.
+        Futures has no cancel/replace endpoint for STOP_MARKET orders. The reconciler is held off the
+        symbol until the new SL has landed (or the retries give up), so it never repairs the gap itself.
+        """
+        symbol = bracket['symbol']
+        log_ctx = {"symbol": symbol, "group_id": bracket['group_id'], "order_id": bracket['order_id']}
+
+        self._hold(bracket)
+        cancelled, new_sl = await asyncio.gather(
+            asyncio.to_thread(self.trader.cancel_order, symbol=symbol, order_id=bracket['order_id']),
+            asyncio.to_thread(self._place_breakeven_sl, bracket),
+            return_exceptions=True,
+        )
+
+        if isinstance(new_sl, Exception) or 'orderId' not in new_sl:
+            logging.error("Failed to place breakeven STOPLOSS: %s", new_sl, extra=log_ctx)
+            with self._lock:
+                self._pending[bracket['group_id']] = bracket
+            if not isinstance(cancelled, Exception) and 'orderId' in cancelled:
+                # The old SL is gone, so only the placement is retried; re-adding the bracket would
+                # cancel the already-cancelled order again on every tick.
+                self._spawn(self._retry_placement(bracket))
+            else:
+                # Old SL is still live: re-arm after a cooldown instead of on the next tick.
+                self._release(bracket)
+                self._spawn(self._rearm(bracket))
+            return None
+
+        if isinstance(cancelled, Exception) or 'orderId' not in cancelled:
+            logging.warning("Breakeven SL placed but old STOPLOSS was not cancelled: %s", cancelled, extra=log_ctx)
+        try:
+            return self._amended(bracket, new_sl)
+        finally:
+            self._release(bracket)
+
+    def _amended(self, bracket: dict, new_sl: dict):
+        log_ctx = {"symbol": bracket['symbol'], "group_id": bracket['group_id'], "order_id": new_sl['orderId']}
+        logging.info("Moved STOPLOSS to breakeven %s, new order ID: %s", bracket['breakeven_price'], new_sl['orderId'], extra=log_ctx)
+        if self.on_amended is not None:
+            try:
+                self.on_amended(bracket, new_sl)
+            except Exception as e:
+                logging.error("Breakeven on_amended callback failed: %s", e, extra=log_ctx)
+        return new_sl
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _is_pending(self, group_id):
+        with self._lock:
+            return group_id in self._pending
+
+    async def _retry_placement(self, bracket: dict):
+        """ Place the breakeven SL again with exponential backoff, then release the reconciler's hold. """
+        try:
+            return await self._place_with_backoff(bracket)
+        finally:
+            self._release(bracket, wake=True)
+
+    async def _place_with_backoff(self, bracket: dict):
+        group_id = bracket['group_id']
+        log_ctx = {"symbol": bracket['symbol'], "group_id": group_id}
+        delay = self.retry_delay
+        for attempt in range(1, self.max_retries + 1):
+            await asyncio.sleep(delay)
+            delay *= 2
+            if not self._is_pending(group_id):
+                return None  # position closed / legs reconciled in the meantime
+            try:
+                new_sl = await asyncio.to_thread(self._place_breakeven_sl, bracket)
+            except Exception as e:
+                new_sl = e
+            if not isinstance(new_sl, Exception) and 'orderId' in new_sl:
+                with self._lock:
+                    self._pending.pop(group_id, None)
+                return self._amended(bracket, new_sl)
+            logging.error("[Attempt %s] Failed to place breakeven STOPLOSS: %s", attempt, new_sl, extra=log_ctx)
+
+        with self._lock:
+            self._pending.pop(group_id, None)
+        logging.critical("Giving up on breakeven STOPLOSS, leaving the missing SL to the reconciler", extra=log_ctx)
+        return None
+
+    async def _rearm(self, bracket: dict):
+        await asyncio.sleep(self.cooldown)
+        with self._lock:
+            if self._pending.pop(bracket['group_id'], None) is None:
+                return
+        self.add(bracket)
+
+    async def on_tick(self, symbol: str, bid: float, ask: float):
+        triggered = self.pop_triggered(symbol, bid, ask)
+        if triggered:
+            await asyncio.gather(*(self.amend_stop_loss(bracket) for bracket in triggered))
+
+    async def watch(self, symbol: str):
+        """ Consume the bookTicker stream for one symbol and amend stops as thresholds are crossed. """
+        async for tick in book_ticker_stream(symbol):
+            await self.on_tick(symbol, tick['bid'], tick['ask'])
+
+    async def _run(self, symbols):
+        await asyncio.gather(*(self.watch(symbol) for symbol in symbols))
+
+    def seed(self, symbols):
+        """
+        Re-arm brackets left by a previous run: every open STOP_MARKET order whose order_groups SL row still
+        carries a breakeven threshold (rows written by an amend carry 0). Returns the number of brackets added.
+        """
+        symbols = set(symbols)
+        stops = [o for o in self.trader.get_open_orders() if o['type'] == "STOP_MARKET" and o['symbol'] in symbols]
+        if not stops:
+            return 0
+        rows = {row['order_id']: row for row in self.fetch_order_groups([o['orderId'] for o in stops])}
+        entries = {p['symbol']: float(p['entryPrice']) for p in self.trader.get_position_risk() if float(p['positionAmt']) != 0}
+
+        seeded = 0
+        for order in stops:
+            row = rows.get(order['orderId'])
+            if row is None or row['type'] != "SL" or not row.get('breakeven_threshold') or order['symbol'] not in entries:
+                continue
+            with self._lock:
+                if row['group_id'] in self.brackets:
+                    continue
+            self.add({
+                "group_id": row['group_id'],
+                "symbol": order['symbol'],
+                "direction": row['direction'],
+                "order_id": order['orderId'],
+                "quantity": Decimal(order['origQty']) - Decimal(order.get('executedQty', '0')),
+                "entry_price": entries[order['symbol']],
+                "breakeven_threshold": float(row['breakeven_threshold']),
+                "breakeven_price": Decimal(str(row['breakeven_price'])),
+            })
+            seeded += 1
+        logging.info("Seeded %s breakeven bracket(s) from open orders", seeded)
+        return seeded
+
+    def start(self, symbols):
+        """
+        Run the watcher on its own thread and event loop, so blocking work in the
+        strategy loop (REST calls, sleeps between legs) never delays a breakeven amend.
+        Brackets from a previous run are seeded first when fetch_order_groups is set.
+        """
+        if self._thread is not None:
+            return self._thread
+        if self.fetch_order_groups is not None:
+            try:
+                self.seed(symbols)
+            except Exception:
+                logging.exception("🔥 Failed to seed breakeven brackets, only new entries will be tracked:")
+        self._thread = threading.Thread(target=asyncio.run, args=(self._run(list(symbols)),),
+                                        name="breakeven-manager", daemon=True)
+        self._thread.start()
+        return self._thread
@@ -0,0 +1,148 @@
+import dataclasses
+import os
+import re
+import tomllib
+from dataclasses import dataclass, field
+
+from utils.resampler import interval_to_ms
+
+
+@dataclass
+class StrategyConfig:
+    risk_amount: float = 15
+    sl_percentage: float = 0.5
+    fee: float = 0.1
+    portfolio_threshold: float = 20
+    rsi_lower: float = 30
+    rsi_upper: float = 70
+    sma_period: int = 30
+    bb_std_dev: float = 2
+    breakeven_buffer_percentage: float = 0.02  # of the breakeven price, past it before the SL moves
+    min_tp_gap_percentage: float = 0.3         # of the entry price, minimum distance to the SMA take profit
+    rsi_period: int = 7
+    max_concurrent_trades: int = 3
+
+    @property
+    def usdt_entry_size(self):
+        return self.risk_amount / ((self.sl_percentage + self.fee) / 100)
+
+
+@dataclass
+class Config:
+    symbols: list = field(default_factory=lambda: ["SOLUSDT"])
+    interval: str = "5m"
+    higher_intervals: list = field(default_factory=list)  # resampled from `interval`, e.g. ["15m", "1h"]
+    history_limit: int = 150
+    log_file: str = "execution.log"
+    exchange_info_file: str = "exchange_info.json"
+    strategy: StrategyConfig = field(default_factory=StrategyConfig)
+
+
+INTERVAL_PATTERN = re.compile(r"^\d+[mhdwM]$")
+MAX_CACHED_CANDLES = 200   # CandleCache window per symbol/timeframe
+MAX_HISTORY_LIMIT = 1500   # most klines Binance returns per request
+
+
+def _check(declared, value):
+    """
+    Return value as the declared type, or None if that would lose information. Bools are never numbers
+    here, ints only accept integral floats (30.0, not 3.9) and floats accept ints.
+    """
+    if isinstance(value, bool):
+        return None
+    if declared is int:
+        if isinstance(value, int):
+            return value
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        return None
+    if declared is float:
+        return float(value) if isinstance(value, (int, float)) else None
+    if declared is str:
+        return value if isinstance(value, str) else None
+    if declared is list:
+        if isinstance(value, str):
+            value = [value]
+        return value if isinstance(value, list) and all(isinstance(v, str) for v in value) else None
+    return value
+
+
+def _build(cls, data: dict, section: str):
+    """ Instantiate a config dataclass, rejecting unknown keys and values that are not of the declared type. """
+    known = {f.name: f for f in dataclasses.fields(cls)}
+    unknown = set(data) - set(known)
+    if unknown:
+        raise ValueError(f"Unknown {section} option(s): {', '.join(sorted(unknown))}")
+
+    values = {}
+    for name, value in data.items():
+        declared = known[name].type
+        checked = _check(declared, value)
+        if checked is None:
+            expected = "list of str" if declared is list else declared.__name__
+            raise ValueError(f"{section}.{name} must be {expected}, got {value!r}")
+        values[name] = checked
+    return cls(**values)
+
+
+def _validate(config: Config):
+    if not config.symbols:
+        raise ValueError("config.symbols must list at least one symbol")
+    for name in ("interval", "higher_intervals"):
+        value = getattr(config, name)
+        for interval in value if isinstance(value, list) else [value]:
+            if not INTERVAL_PATTERN.match(interval):
+                raise ValueError(f"config.{name} has an invalid interval {interval!r}, expected e.g. '5m', '1h', '1d'")
+
+    # resampled timeframes must be fixed-length multiples of the base interval (no '1M')
+    for interval in config.higher_intervals:
+        try:
+            base_ms, target_ms = interval_to_ms(config.interval), interval_to_ms(interval)
+        except ValueError:
+            raise ValueError(f"config.higher_intervals: cannot resample {interval!r} from {config.interval!r}")
+        if target_ms <= base_ms or target_ms % base_ms:
+            raise ValueError(f"config.higher_intervals: {interval!r} is not a multiple of interval {config.interval!r}")
+
+    # the first candle must already have every indicator: RSI reads rsi_period + 100 closes, BB sma_period,
+    # and the last fetched kline is still open and dropped
+    strategy = config.strategy
+    needed = max(strategy.sma_period, strategy.rsi_period + 100)
+    if needed > MAX_CACHED_CANDLES:
+        raise ValueError(f"strategy.sma_period/rsi_period need {needed} candles, more than the {MAX_CACHED_CANDLES} kept in cache")
+    if config.history_limit < needed + 1:
+        raise ValueError(f"config.history_limit must be at least {needed + 1} for sma_period={strategy.sma_period} "
+                         f"and rsi_period={strategy.rsi_period}, got {config.history_limit}")
+    if config.history_limit > MAX_HISTORY_LIMIT:
+        raise ValueError(f"config.history_limit must be at most {MAX_HISTORY_LIMIT}, got {config.history_limit}")
+    for name in ("sma_period", "rsi_period"):
+        if getattr(strategy, name) <= 0:
+            raise ValueError(f"strategy.{name} must be positive, got {getattr(strategy, name)}")
+
+
+def load_config(path: str = None):
+    """
+    Load a TOML (.toml) or YAML (.yaml/.yml) config file. Missing options fall back to the defaults above;
+    with no path at all the defaults are used as-is.
+    """
+    if path is None:
+        return Config()
+
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".toml":
+        with open(path, "rb") as f:
+            data = tomllib.load(f)
+    elif ext in (".yaml", ".yml"):
+        import yaml  # only needed for YAML configs
+        with open(path) as f:
+            data = yaml.safe_load(f) or {}
+    else:
+        raise ValueError(f"Unsupported config format: {path} (expected .toml, .yaml or .yml)")
+
+    strategy = data.pop("strategy", None) or {}
+    if not isinstance(strategy, dict):
+        raise ValueError(f"strategy must be a table of options, got {strategy!r}")
+    config = _build(Config, data, "config")
+    config.strategy = _build(StrategyConfig, strategy, "strategy")
+    config.symbols = [s.upper() for s in config.symbols]
+    _validate(config)
+    return config
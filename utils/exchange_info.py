@@ -0,0 +1,143 @@
+import json
+import logging
+import os
+import threading
+import time
+from decimal import Decimal, ROUND_DOWN, ROUND_HALF_UP
+
+import requests
+
+EXCHANGE_INFO_URL = "https://fapi.binance.com/fapi/v1/exchangeInfo"
+
+
+def _parse_symbol(info: dict):
+    """ Turn one exchangeInfo symbol entry into Decimal quantizers. """
+    filters = {f['filterType']: f for f in info.get('filters', [])}
+    tick_size = Decimal(filters['PRICE_FILTER']['tickSize']).normalize()
+    step_size = Decimal(filters['LOT_SIZE']['stepSize']).normalize()
+    market_step = Decimal(filters.get('MARKET_LOT_SIZE', filters['LOT_SIZE'])['stepSize']).normalize()
+    return {
+        'tick_size': tick_size,
+        'step_size': step_size,
+        'market_step_size': market_step,
+        'min_qty': Decimal(filters['LOT_SIZE']['minQty']),
+        'min_notional': Decimal(filters.get('MIN_NOTIONAL', {}).get('notional', '0')),
+        # exponents used to render quantized values without trailing noise, e.g. Decimal('0.01');
+        # capped at 1 so a step of 10 (normalized to 1E+1) still renders as plain digits
+        'price_exp': Decimal(1).scaleb(min(tick_size.as_tuple().exponent, 0)),
+        'qty_exp': Decimal(1).scaleb(min(step_size.as_tuple().exponent, market_step.as_tuple().exponent, 0)),
+    }
+
+
+def _quantize(value, step: Decimal, exp: Decimal, rounding):
+    steps = (Decimal(str(value)) / step).to_integral_value(rounding=rounding)
+    return (steps * step).quantize(exp)
+
+
+class ExchangeInfoCache:
+    """
+    Per-symbol tick size, step size and min notional from /fapi/v1/exchangeInfo.
+    Loaded once (from the local file if it is recent enough), then refreshed in the background,
+    so sizing and pricing an order is a dict lookup plus Decimal arithmetic.
+
+    round_quantity/round_price return the quantized Decimal, which goes on the wire as-is; a float
+    round-trip could turn 0.0000123 back into '1.23e-05', which the exchange rejects.
+    """
+
+    def __init__(self, path: str = 'exchange_info.json', max_age: float = 24 * 60 * 60):
+        self.path = path
+        self.max_age = max_age
+        self.symbols = {}
+        self.fetched_at = 0
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def load(self):
+        """ Use the persisted copy if it is fresh, otherwise fetch; fall back to a stale copy if the fetch fails. """
+        raw = self._read_file()
+        if raw is not None and time.time() - raw['fetched_at'] < self.max_age:
+            self._apply(raw)
+            return self
+        try:
+            self.refresh()
+        except Exception as e:
+            if raw is None:
+                raise
+            logging.warning(f"⚠️ Failed to fetch exchange info: {e}. Using cached copy from {self.path}")
+            self._apply(raw)
+        return self
+
+    def refresh(self):
+        response = requests.get(EXCHANGE_INFO_URL, timeout=10)
+        response.raise_for_status()
+        raw = {'fetched_at': time.time(), 'symbols': response.json()['symbols']}
+        self._apply(raw)
+        self._write_file(raw)
+        logging.info("Loaded exchange info for %s symbols", len(self.symbols))
+
+    def _apply(self, raw: dict):
+        symbols = {}
+        for info in raw['symbols']:
+            try:
+                symbols[info['symbol']] = _parse_symbol(info)
+            except KeyError:
+                continue  # symbols without price/lot filters cannot be traded anyway
+        # single assignment so readers on other threads always see a complete table
+        self.symbols = symbols
+        self.fetched_at = raw['fetched_at']
+
+    def _read_file(self):
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"⚠️ Ignoring unreadable exchange info cache {self.path}: {e}")
+            return None
+
+    def _write_file(self, raw: dict):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(raw, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.warning(f"⚠️ Failed to persist exchange info to {self.path}: {e}")
+
+    def filters(self, symbol: str):
+        return self.symbols[symbol]
+
+    def round_quantity(self, symbol: str, quantity: float, market: bool = False):
+        """ Floor a quantity to the symbol's step size (MARKET_LOT_SIZE step for market orders). Returns a Decimal. """
+        f = self.symbols[symbol]
+        step = f['market_step_size'] if market else f['step_size']
+        return _quantize(quantity, step, f['qty_exp'], ROUND_DOWN)
+
+    def round_price(self, symbol: str, price: float, rounding=ROUND_HALF_UP):
+        """ Round a price to the symbol's tick size, as a Decimal. Pass ROUND_DOWN/ROUND_UP to bias a stop outward. """
+        f = self.symbols[symbol]
+        return _quantize(price, f['tick_size'], f['price_exp'], rounding)
+
+    def is_valid_order(self, symbol: str, quantity: float, price: float):
+        """ True if quantity meets minQty and quantity * price meets the min notional. """
+        f = self.symbols[symbol]
+        qty = Decimal(str(quantity))
+        return qty >= f['min_qty'] and qty * Decimal(str(price)) >= f['min_notional']
+
+    def _run(self, interval: float):
+        while not self._stopped.wait(interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logging.warning(f"⚠️ Failed to refresh exchange info: {e}. Keeping current filters")
+
+    def start_refresh(self, interval: float = 60 * 60):
+        if self._thread is not None:
+            return self._thread
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="exchange-info-refresh", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stopped.set()
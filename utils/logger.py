@@ -1,20 +1,90 @@
-import logging 
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
 
-def init_logger():
-    logging.basicConfig(
-        filename='execution.log',  # Log file name
-        filemode='a',        # Append mode
-        format='%(asctime)s - %(levelname)s - %(filename)s - %(funcName)s | %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S',
-        level=logging.INFO   # Minimum level to capture
-    )
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(filename)s - %(funcName)s | %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Extra fields copied into every JSON record when present, e.g.
+# logging.info("Quantity: %s", qty, extra={"symbol": symbol, "group_id": group_id})
+STRUCTURED_FIELDS = ("symbol", "group_id", "order_id", "latency_ms")
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """ One JSON object per line so the log file can be loaded straight into pandas/jq. """
+
+    def format(self, record):
+        payload = {
+            "time": self.formatTime(record, DATE_FORMAT),
+            "level": record.levelname,
+            "logger": record.name,
+            "file": record.filename,
+            "func": record.funcName,
+            "message": record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                payload[field] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that hands the raw record to the listener thread.
+    The stock prepare() renders the message on the calling thread; skipping it keeps
+    %-formatting of candles and order responses off the trading path.
+    Arguments passed to a log call must not be mutated afterwards.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def init_logger(filename='execution.log', level=logging.INFO, max_bytes=10 * 1024 * 1024,
+                backup_count=5, when=None, json_file=True):
+    """
+    Route the root logger through an in-memory queue drained by a background thread.
+    File output rotates by size (max_bytes) or, if `when` is given (e.g. 'midnight'), by time.
+    Calling it again returns the already running listener.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    if when:
+        file_handler = logging.handlers.TimedRotatingFileHandler(
+            filename, when=when, backupCount=backup_count, encoding='utf-8')
+    else:
+        file_handler = logging.handlers.RotatingFileHandler(
+            filename, mode='a', maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+    file_handler.setFormatter(JsonFormatter() if json_file else logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT))
 
     # Add console logging too
     console = logging.StreamHandler()
-    console.setLevel(logging.INFO)
-    formatter = logging.Formatter(
-    '%(asctime)s - %(levelname)s - %(filename)s - %(funcName)s | %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
-    console.setFormatter(formatter)
-    logging.getLogger('').addHandler(console)
\ No newline at end of file
+    console.setLevel(level)
+    console.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger('')
+    root.setLevel(level)
+    root.addHandler(_DeferredQueueHandler(log_queue))
+
+    _listener = logging.handlers.QueueListener(log_queue, file_handler, console, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logger)
+    return _listener
+
+
+def stop_logger():
+    """ Flush whatever is still queued and stop the listener thread. """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,265 @@
+import logging
+import threading
+import time
+
+# Exchange order type -> bracket leg as stored in order_groups
+LEG_TYPES = {"STOP_MARKET": "SL", "TAKE_PROFIT": "TP"}
+
+
+class OrderReconciler:
+    """
+    Background job that diffs exchange positions/open orders against order_groups and repairs brackets.
+
+      - no position but SL/TP orders still open      -> cancel them all in one allOpenOrders call
+      - leg whose sibling has already filled/closed  -> cancel via batchOrders
+      - position quantity not covered by SL (or TP)  -> place the missing legs via batchOrders
+
+    When a PortfolioRisk is given, each pass also refreshes its balance, mark prices and the SL orders
+    protecting each position, so the risk gate never needs its own account calls. When a BreakevenManager
+    is given, brackets of flat positions and of cancelled legs are dropped so their stops are never amended.
+
+    Symbols are skipped while anyone holds them (an entry placing its legs, a breakeven amend between its
+    cancel and its placement), so a repair never duplicates a stop that is about to land. Repaired legs are
+    reduceOnly: should a duplicate slip through, it can close the position but never open a reverse one.
+
+    Assumes one-way position mode, which is what the strategy trades in.
+    """
+
+    def __init__(self, trader, symbols, sl_percentage, exchange_info, fetch_order_groups, log_order=None,
+                 portfolio_risk=None, breakeven_manager=None, interval: float = 30, grace_seconds: float = 30):
+        self.trader = trader
+        self.symbols = list(symbols)
+        self.sl_percentage = sl_percentage
+        self.exchange_info = exchange_info            # ExchangeInfoCache used to round repaired legs
+        self.fetch_order_groups = fetch_order_groups  # (order_ids) -> order_groups rows of the groups those orders belong to
+        self.log_order = log_order                    # (data) -> None, e.g. log_into_supabase
+        self.portfolio_risk = portfolio_risk          # PortfolioRisk resynced from exchange SLs on every pass
+        self.breakeven_manager = breakeven_manager    # BreakevenManager whose stale brackets are dropped
+        if breakeven_manager is not None:
+            breakeven_manager.reconciler = self       # so amends can hold their symbol
+        self.interval = interval
+        self.grace_seconds = grace_seconds            # how long a new leg's order_groups row may lag behind it
+        self.take_profit_prices = {}  # symbol -> latest TP target (SMA) published by the strategy loop
+        self._holds = {}              # symbol -> set of owners currently placing/replacing legs
+        self._holds_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def set_take_profit_price(self, symbol: str, price: float):
+        self.take_profit_prices[symbol] = price
+
+    def hold(self, symbol: str, owner: str = "entry"):
+        """ Leave a symbol alone until `owner` releases it, e.g. while the strategy is placing its legs. """
+        with self._holds_lock:
+            self._holds.setdefault(symbol, set()).add(owner)
+
+    def release(self, symbol: str, owner: str = "entry", wake: bool = False):
+        """ Drop `owner`'s hold; safe to call when it holds nothing. """
+        with self._holds_lock:
+            owners = self._holds.get(symbol)
+            if owners is not None:
+                owners.discard(owner)
+                if not owners:
+                    del self._holds[symbol]
+        if wake:
+            self.wake()
+
+    def wake(self):
+        """ Run a pass now instead of waiting for the next interval. """
+        self._wake.set()
+
+    def _is_held(self, symbol: str):
+        with self._holds_lock:
+            return bool(self._holds.get(symbol))
+
+    def reconcile(self):
+        positions = {p['symbol']: p for p in self.trader.get_position_risk()}
+        open_orders = {}
+        for order in self.trader.get_open_orders():
+            open_orders.setdefault(order['symbol'], []).append(order)
+        leg_ids = [o['orderId'] for orders in open_orders.values() for o in orders if o['type'] in LEG_TYPES]
+        groups = self.fetch_order_groups(leg_ids) if leg_ids else []
+        if self.portfolio_risk is not None:
+            self.portfolio_risk.set_balance(self.trader.get_usdt_balance())
+
+        for symbol in self.symbols:
+            if self._is_held(symbol):
+                continue
+            position = positions.get(symbol)
+            if position is None:
+                continue
+            if self.portfolio_risk is not None:
+                self.portfolio_risk.update_mark(symbol, float(position['markPrice']))
+            try:
+                self.reconcile_symbol(symbol, position, open_orders.get(symbol, []), groups)
+            except Exception as e:
+                logging.error("Reconcile failed: %s", e, extra={"symbol": symbol})
+
+    def reconcile_symbol(self, symbol: str, position: dict, open_orders: list, groups: list):
+        position_amt = float(position['positionAmt'])
+        legs = [o for o in open_orders if o['type'] in LEG_TYPES]
+
+        if position_amt == 0:
+            if self.portfolio_risk is not None:
+                self.portfolio_risk.replace_symbol(symbol, [])
+            if self.breakeven_manager is not None:
+                self.breakeven_manager.remove_symbol(symbol)
+            if legs:
+                logging.warning("No %s position but %s SL/TP orders open, cancelling", symbol, len(legs), extra={"symbol": symbol})
+                self.trader.cancel_all_open_orders(symbol)
+            return
+
+        direction = "LONG" if position_amt > 0 else "SHORT"
+        close_side = "SELL" if direction == "LONG" else "BUY"
+
+        stale = self._find_stale_legs(legs, close_side, groups)
+        if stale:
+            logging.warning("Cancelling stale legs: %s", [o['orderId'] for o in stale], extra={"symbol": symbol})
+            self.trader.cancel_batch_orders(symbol, [o['orderId'] for o in stale])
+
+        stale_ids = {o['orderId'] for o in stale}
+        if stale and self.breakeven_manager is not None:
+            stale_groups = {row['group_id'] for row in groups if row['order_id'] in stale_ids}
+            self.breakeven_manager.remove_symbol(symbol, group_ids=stale_groups, order_ids=stale_ids)
+        live = [o for o in legs if o['orderId'] not in stale_ids]
+        missing = self._missing_legs(symbol, position, abs(position_amt), direction, close_side, live)
+        if self.portfolio_risk is not None:
+            sign = 1 if direction == "LONG" else -1
+            self.portfolio_risk.replace_symbol(symbol, [
+                (o['orderId'], sign * (float(o['origQty']) - float(o.get('executedQty', 0))),
+                 float(position['entryPrice']), float(o['stopPrice']))
+                for o in live if o['type'] == "STOP_MARKET"
+            ])
+        if not missing:
+            return
+
+        logging.warning("Repairing missing legs: %s", missing, extra={"symbol": symbol})
+        results = self.trader.place_batch_orders([order for _, order in missing])
+        group_id = self._group_of(live, groups)
+        if group_id is None:
+            logging.warning("No order_groups row for any live %s leg, repaired legs will not be logged", symbol, extra={"symbol": symbol})
+        for (leg, _), result in zip(missing, results):
+            if 'orderId' not in result:
+                logging.error("Failed to repair %s leg: %s", leg, result, extra={"symbol": symbol, "group_id": group_id})
+                continue
+            if self.portfolio_risk is not None and leg == "SL":
+                order = dict(missing)["SL"]
+                self.portfolio_risk.upsert(result['orderId'], symbol, sign * float(order['quantity']),
+                                           float(position['entryPrice']), float(order['stopPrice']))
+            if self.log_order is not None and group_id is not None:
+                try:
+                    self.log_order({
+                        "group_id": group_id,
+                        "order_id": result['orderId'],
+                        "type": leg,
+                        "direction": direction,
+                        "breakeven_threshold": 0.00,
+                        "breakeven_price": 0.00
+                    })
+                except Exception as e:
+                    logging.error("Failed to log repaired %s leg: %s", leg, e, extra={"symbol": symbol, "group_id": group_id})
+
+    def _group_of(self, legs: list, groups: list):
+        """ Group of this symbol's bracket, taken from the order_groups rows of its own open legs (newest wins). """
+        rows_by_order = {row['order_id']: row for row in groups}
+        group_ids = [rows_by_order[o['orderId']]['group_id'] for o in legs if o['orderId'] in rows_by_order]
+        return max(group_ids) if group_ids else None
+
+    def _find_stale_legs(self, legs: list, close_side: str, groups: list):
+        """
+        Legs on the wrong side, or whose sibling leg in the same group is no longer open.
+
+        A leg that is not in order_groups cannot be judged, and may itself be the sibling of a known leg (a
+        breakeven SL whose row is still being written, or failed to write), so known legs of the other type
+        are not judged stale for lack of a sibling either. Every other leg of the symbol still is. Unknown
+        legs older than grace_seconds are reported, since their row is not merely late.
+        """
+        open_ids = {o['orderId'] for o in legs}
+        rows_by_order = {row['order_id']: row for row in groups}
+        group_legs = {}
+        for row in groups:
+            if row['type'] in ("SL", "TP"):
+                group_legs.setdefault(row['group_id'], {}).setdefault(row['type'], set()).add(row['order_id'])
+
+        stale = [o for o in legs if o['side'] != close_side]
+        legs = [o for o in legs if o['side'] == close_side]
+
+        now_ms = time.time() * 1000
+        unknown_types = set()
+        for order in legs:
+            if order['orderId'] in rows_by_order:
+                continue
+            unknown_types.add(LEG_TYPES[order['type']])
+            if now_ms - order.get('time', 0) >= self.grace_seconds * 1000:
+                logging.warning("Open %s leg %s is not in order_groups, leaving it alone", LEG_TYPES[order['type']],
+                                order['orderId'], extra={"symbol": order.get('symbol'), "order_id": order['orderId']})
+
+        for order in legs:
+            row = rows_by_order.get(order['orderId'])
+            if row is None or row['type'] not in ("SL", "TP"):
+                continue
+            sibling_type = "TP" if row['type'] == "SL" else "SL"
+            sibling = group_legs[row['group_id']].get(sibling_type)
+            if sibling and not (sibling & open_ids) and sibling_type not in unknown_types:
+                stale.append(order)
+        return stale
+
+    def _missing_legs(self, symbol: str, position: dict, quantity: float, direction: str, close_side: str, live: list):
+        covered = {"SL": 0.0, "TP": 0.0}
+        for order in live:
+            covered[LEG_TYPES[order['type']]] += float(order['origQty']) - float(order.get('executedQty', 0))
+
+        missing = []
+        sl_qty = self.exchange_info.round_quantity(symbol, quantity - covered["SL"], market=True)
+        if sl_qty > 0:
+            entry = float(position['entryPrice'])
+            offset = entry * self.sl_percentage / 100
+            stop_price = self.exchange_info.round_price(symbol, entry - offset if direction == "LONG" else entry + offset)
+            missing.append(("SL", {
+                'symbol': symbol,
+                'side': close_side,
+                'type': 'STOP_MARKET',
+                'stopPrice': stop_price,
+                'quantity': sl_qty,
+                'timeInForce': 'GTC',
+                'reduceOnly': 'true'
+            }))
+
+        tp_qty = self.exchange_info.round_quantity(symbol, quantity - covered["TP"])
+        if tp_qty > 0:
+            tp_price = self.take_profit_prices.get(symbol)
+            if tp_price is None:
+                logging.warning("No take profit target known, leaving TP uncovered", extra={"symbol": symbol})
+            else:
+                missing.append(("TP", {
+                    'symbol': symbol,
+                    'side': close_side,
+                    'type': 'TAKE_PROFIT',
+                    'stopPrice': tp_price,
+                    'price': tp_price,
+                    'quantity': tp_qty,
+                    'timeInForce': 'GTC',
+                    'reduceOnly': 'true'
+                }))
+        return missing
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.reconcile()
+            except Exception:
+                logging.exception("🔥 Unexpected reconciler error:")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def start(self):
+        if self._thread is not None:
+            return self._thread
+        self._thread = threading.Thread(target=self._run, name="order-reconciler", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
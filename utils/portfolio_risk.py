@@ -0,0 +1,197 @@
+import threading
+
+import numpy as np
+
+
+class PortfolioRisk:
+    """
+    Open positions and their stop losses kept in flat NumPy arrays, one slot per SL order.
+
+    For a slot with signed quantity q, entry e and stop s the dollar-at-risk is
+        max(q * (e - s), 0) + |q| * e * fee / 100
+    i.e. what is lost if the stop fills, plus fees, which is how risk_amount sizes an entry.
+    Risk is summed per symbol and combined across symbols as sqrt(r' L r), where L is the correlation of
+    the positions' losses: the correlation of recent close-to-close returns, flipped in sign for a long/short
+    pair, so only a measured correlation lets a hedge offset. Pairs without enough history are taken as
+    perfectly loss-correlated (L = 1) whatever their direction, and the result is never below the largest
+    single-symbol risk.
+    """
+
+    def __init__(self, fee: float = 0.1, capacity: int = 64, min_returns: int = 20):
+        self.fee = fee
+        self.min_returns = min_returns
+        self.balance = None
+        self.keys = {}                               # key (SL order id) -> slot
+        self.slot_keys = []                          # slot -> key
+        self.quantity = np.zeros(capacity)           # signed: long > 0, short < 0
+        self.entry = np.zeros(capacity)
+        self.stop = np.zeros(capacity)
+        self.symbol_idx = np.zeros(capacity, dtype=np.intp)
+        self.symbols = {}                            # symbol -> index into marks/correlation
+        self.marks = np.zeros(0)
+        self.returns = {}                            # symbol -> np.ndarray of recent returns
+        self.correlation = np.ones((0, 0))
+        self.correlation_known = np.ones((0, 0), dtype=bool)  # False where a pair lacks history
+        self._correlation_dirty = False
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.slot_keys)
+
+    def _symbol_index(self, symbol: str):
+        idx = self.symbols.get(symbol)
+        if idx is None:
+            idx = self.symbols[symbol] = len(self.symbols)
+            self.marks = np.append(self.marks, 0.0)
+            self._correlation_dirty = True
+        return idx
+
+    def _grow(self):
+        capacity = len(self.quantity) * 2
+        for name in ("quantity", "entry", "stop", "symbol_idx"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _upsert(self, key, symbol: str, quantity: float, entry_price: float, stop_price: float):
+        slot = self.keys.get(key)
+        if slot is None:
+            slot = len(self.slot_keys)
+            if slot == len(self.quantity):
+                self._grow()
+            self.keys[key] = slot
+            self.slot_keys.append(key)
+        self.quantity[slot] = quantity
+        self.entry[slot] = entry_price
+        self.stop[slot] = stop_price
+        self.symbol_idx[slot] = self._symbol_index(symbol)
+        if self.marks[self.symbol_idx[slot]] == 0:
+            self.marks[self.symbol_idx[slot]] = entry_price
+
+    def _remove(self, key):
+        slot = self.keys.pop(key, None)
+        if slot is None:
+            return
+        last = len(self.slot_keys) - 1
+        last_key = self.slot_keys.pop()
+        if slot != last:  # move the last slot into the hole to keep the arrays dense
+            self.slot_keys[slot] = last_key
+            self.keys[last_key] = slot
+            for arr in (self.quantity, self.entry, self.stop, self.symbol_idx):
+                arr[slot] = arr[last]
+
+    def upsert(self, key, symbol: str, quantity: float, entry_price: float, stop_price: float):
+        """ Add or update one protected position. quantity is signed (negative for shorts). """
+        with self._lock:
+            self._upsert(key, symbol, quantity, entry_price, stop_price)
+
+    def remove(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def replace_symbol(self, symbol: str, rows):
+        """ Replace everything tracked for a symbol with rows of (key, quantity, entry_price, stop_price). """
+        with self._lock:
+            idx = self.symbols.get(symbol)
+            if idx is not None:
+                n = len(self.slot_keys)
+                for slot in np.flatnonzero(self.symbol_idx[:n] == idx)[::-1]:
+                    self._remove(self.slot_keys[slot])
+            for key, quantity, entry_price, stop_price in rows:
+                self._upsert(key, symbol, quantity, entry_price, stop_price)
+
+    def set_balance(self, balance: float):
+        self.balance = balance
+
+    def update_mark(self, symbol: str, price: float):
+        with self._lock:
+            idx = self._symbol_index(symbol)  # may grow self.marks, so resolve it before indexing
+            self.marks[idx] = price
+
+    def update_returns(self, symbol: str, closes):
+        """ Feed recent closes for a symbol; the correlation matrix is rebuilt on the next risk query. """
+        if closes is None or len(closes) < 2:
+            return
+        closes = np.asarray(closes, dtype=float)
+        with self._lock:
+            self._symbol_index(symbol)
+            self.returns[symbol] = np.diff(closes) / closes[:-1]
+            self._correlation_dirty = True
+
+    def _rebuild_correlation(self):
+        k = len(self.symbols)
+        corr = np.ones((k, k))
+        known = np.eye(k, dtype=bool)
+        usable = [s for s, r in self.returns.items() if len(r) >= self.min_returns]
+        if len(usable) > 1:
+            n = min(len(self.returns[s]) for s in usable)
+            sample = np.vstack([self.returns[s][-n:] for s in usable])
+            with np.errstate(invalid='ignore', divide='ignore'):
+                sub = np.corrcoef(sample)
+            idx = np.array([self.symbols[s] for s in usable])
+            known[np.ix_(idx, idx)] = ~np.isnan(sub)  # flat prices give no correlation
+            corr[np.ix_(idx, idx)] = np.nan_to_num(sub, nan=1.0)
+        self.correlation = corr
+        self.correlation_known = known
+        self._correlation_dirty = False
+
+    def _position_risk(self, quantity, entry, stop):
+        loss = np.maximum(quantity * (entry - stop), 0.0)
+        fees = np.abs(quantity) * entry * self.fee / 100
+        return loss + fees
+
+    def _summarise(self, quantity, entry, stop, symbol_idx):
+        k = len(self.symbols)
+        if self._correlation_dirty or self.correlation.shape != (k, k):
+            self._rebuild_correlation()
+
+        risk = self._position_risk(quantity, entry, stop)
+        per_symbol_risk = np.bincount(symbol_idx, weights=risk, minlength=k)
+        net_quantity = np.bincount(symbol_idx, weights=quantity, minlength=k)
+        net_exposure = net_quantity * self.marks[:k]
+        gross_exposure = np.bincount(symbol_idx, weights=np.abs(quantity), minlength=k) * self.marks[:k]
+        direction = np.where(net_quantity < 0, -1.0, 1.0)
+        loss_correlation = np.where(self.correlation_known, self.correlation * np.outer(direction, direction), 1.0)
+        correlated = float(np.sqrt(max(per_symbol_risk @ loss_correlation @ per_symbol_risk, 0.0)))
+        correlated = max(correlated, float(per_symbol_risk.max(initial=0.0)))
+        return risk, per_symbol_risk, net_exposure, gross_exposure, correlated
+
+    def _percentage(self, amount: float):
+        if not self.balance:
+            return None
+        return round(amount / self.balance * 100, 2)
+
+    def snapshot(self):
+        """ Dollar-at-risk, exposures and the correlation-adjusted risk for everything currently tracked. """
+        with self._lock:
+            n = len(self.slot_keys)
+            risk, per_symbol_risk, net, gross, correlated = self._summarise(
+                self.quantity[:n], self.entry[:n], self.stop[:n], self.symbol_idx[:n])
+            names = sorted(self.symbols, key=self.symbols.get)
+        total = float(risk.sum())
+        return {
+            "positions": n,
+            "dollar_at_risk": total,
+            "correlated_risk": correlated,
+            "per_symbol_risk": dict(zip(names, per_symbol_risk.tolist())),
+            "net_exposure": dict(zip(names, net.tolist())),
+            "gross_exposure": float(gross.sum()),
+            "percentage_at_risk": self._percentage(correlated),
+        }
+
+    def percentage_at_risk(self):
+        """ Correlation-adjusted dollar-at-risk as a percentage of balance, None until a balance is known. """
+        return self.snapshot()["percentage_at_risk"]
+
+    def projected_percentage(self, symbol: str, quantity: float, entry_price: float, stop_price: float):
+        """ percentage_at_risk as it would be after adding the given position. """
+        with self._lock:
+            n = len(self.slot_keys)
+            idx = self._symbol_index(symbol)
+            if self.marks[idx] == 0:
+                self.marks[idx] = entry_price
+            _, _, _, _, correlated = self._summarise(
+                np.append(self.quantity[:n], quantity), np.append(self.entry[:n], entry_price),
+                np.append(self.stop[:n], stop_price), np.append(self.symbol_idx[:n], idx))
+        return self._percentage(correlated)
@@ -0,0 +1,109 @@
+import logging
+import time
+
+from utils.indicator_cache import CandleCache
+
+INTERVAL_UNITS_MS = {"m": 60_000, "h": 3_600_000, "d": 86_400_000, "w": 604_800_000}
+# Binance weekly candles open on Monday 00:00 UTC, the epoch was a Thursday
+WEEK_OFFSET_MS = 4 * 86_400_000
+
+
+def interval_to_ms(interval: str):
+    """ '5m' -> 300000. Monthly candles are not fixed length and cannot be resampled. """
+    unit = interval[-1]
+    if unit not in INTERVAL_UNITS_MS or not interval[:-1].isdigit():
+        raise ValueError(f"Unsupported interval for resampling: {interval}")
+    return int(interval[:-1]) * INTERVAL_UNITS_MS[unit]
+
+
+class CandleResampler:
+    """
+    Rolls closed base-interval candles up into higher-interval candles, one CandleCache per interval.
+
+    Buckets are aligned the way Binance aligns klines (epoch multiples, Monday for weeks), so a 1h bar built
+    from twelve 5m bars matches the exchange's own 1h kline. add_candle() returns only the bars that closed
+    on this update, so indicators for a timeframe are computed once per closed bar rather than per base candle.
+    """
+
+    def __init__(self, base_interval: str, intervals, max_candles: int = 200):
+        self.base_ms = interval_to_ms(base_interval)
+        self.intervals = {}
+        for interval in intervals:
+            target_ms = interval_to_ms(interval)
+            if target_ms <= self.base_ms or target_ms % self.base_ms:
+                raise ValueError(f"{interval} is not a multiple of the base interval {base_interval}")
+            self.intervals[interval] = target_ms
+        self.max_candles = max_candles
+        self.caches = {interval: CandleCache(max_candles=max_candles) for interval in self.intervals}
+        self.partial = {interval: None for interval in self.intervals}
+        self.last_closed = {interval: None for interval in self.intervals}  # open time of the last emitted bar
+
+    def _bucket_start(self, open_time: int, target_ms: int):
+        offset = WEEK_OFFSET_MS if target_ms % INTERVAL_UNITS_MS["w"] == 0 else 0
+        return (open_time - offset) // target_ms * target_ms + offset
+
+    def load_history(self, interval: str, historical_data: list):
+        """
+        Seed a timeframe with its own klines (e.g. from fetch_historical_data) so indicators are ready
+        immediately; replay the recent base candles afterwards to rebuild the bar in progress.
+        """
+        self.caches[interval] = CandleCache(max_candles=self.max_candles, historical_data=historical_data)
+        if self.caches[interval].candles:
+            self.last_closed[interval] = self.caches[interval].candles[-1]['timestamp']
+        self.partial[interval] = None
+
+    def replay(self, base_candles: list):
+        """ Feed historical base candles (skipping the one still open) to rebuild bars not covered by load_history. """
+        now = int(time.time() * 1000)
+        for candle in base_candles or []:
+            if candle['close_time'] < now:
+                self.add_candle(candle)
+
+    def add_candle(self, candle: dict):
+        """ Feed one closed base candle. Returns [(interval, bar), ...] for every higher bar it completes. """
+        close_time = candle['close_time']
+        open_time = close_time + 1 - self.base_ms
+        closed = []
+
+        for interval, target_ms in self.intervals.items():
+            start = self._bucket_start(open_time, target_ms)
+            if self.last_closed[interval] is not None and start <= self.last_closed[interval]:
+                continue  # already part of a bar we have
+
+            bar = self.partial[interval]
+            if bar is not None and bar['timestamp'] != start:
+                # the previous bucket never saw its last base candle (e.g. missed during a reconnect)
+                self._close(interval, bar, closed)
+                bar = None
+
+            if bar is None:
+                bar = self.partial[interval] = {
+                    'timestamp': start,
+                    'open': candle['open'],
+                    'high': candle['high'],
+                    'low': candle['low'],
+                    'close': candle['close'],
+                    'volume': candle['volume'],
+                    'close_time': start + target_ms - 1,
+                    'complete_start': open_time == start,
+                }
+            else:
+                bar['high'] = max(bar['high'], candle['high'])
+                bar['low'] = min(bar['low'], candle['low'])
+                bar['close'] = candle['close']
+                bar['volume'] += candle['volume']
+
+            if close_time == bar['close_time']:
+                self._close(interval, bar, closed)
+
+        return closed
+
+    def _close(self, interval: str, bar: dict, closed: list):
+        self.partial[interval] = None
+        self.last_closed[interval] = bar['timestamp']
+        if not bar.pop('complete_start'):
+            # started mid-bucket (no history loaded), so open/high/low/volume would be wrong
+            logging.info("Dropping partial %s bar starting %s", interval, bar['timestamp'])
+            return
+        self.caches[interval].add_candle(bar)
+        closed.append((interval, bar))
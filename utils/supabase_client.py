@@ -2,16 +2,28 @@ import requests
 import time
 import logging
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
+def strategy_env():
+    '''
+    STRATEGY_ENV as an int. Called once at startup so a missing or malformed value fails there,
+    not at the first candle.
+    '''
+    value = os.getenv("STRATEGY_ENV")
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"STRATEGY_ENV must be set to an integer strategy id, got {value!r}")
 
-orders_table = "orders" if int(os.getenv("STRATEGY_ENV")) == 1 else "orders2"
-order_groups_table = "order_groups" if int(os.getenv("STRATEGY_ENV")) == 1 else "order_groups2"
-trades_table = "trades" if int(os.getenv("STRATEGY_ENV")) == 1 else "trades2"
+def _table(name):
+    '''
+    Strategy 1 uses the base tables (orders, order_groups, trades), any other strategy the "2" copies.
+    Resolved per call so importing this module does not require STRATEGY_ENV.
+    '''
+    return name if strategy_env() == 1 else f"{name}2"
 
-def log_into_supabase(data, supabase_url, api_key, jwt, table_name=order_groups_table):
-    logging.info(f"Attempting to log the following data into supabase: {data}")
+def log_into_supabase(data, supabase_url, api_key, jwt, table_name=None):
+    logging.info("Attempting to log the following data into supabase: %s", data, extra={"group_id": data.get("group_id")})
+    table_name = table_name or _table("order_groups")
     url = f"{supabase_url}/rest/v1/{table_name}"
     headers = {
         "apikey": api_key,
@@ -23,20 +35,22 @@ def log_into_supabase(data, supabase_url, api_key, jwt, table_name=order_groups_
     response = requests.post(url, headers=headers, json=data)
 
     if response.status_code in (200, 201):
-        logging.info("✅ Successfully logged data:", response.json())
+        logging.info("✅ Successfully logged data: %s", response.json())
         return response.json()
     else:
         logging.error(f"❌ Failed to log data ({response.status_code}): {response.text}")
-        return {"error": response.text, "status_code": response.status_code}
+        # raise so callers notice: a missing order_groups row leaves the reconciler blind to that leg
+        raise requests.HTTPError(f"Failed to log into {table_name} ({response.status_code})", response=response)
     
 
-def get_latest_group_id(supabase_url, api_key, jwt, table_name=order_groups_table):
+def get_latest_group_id(supabase_url, api_key, jwt, table_name=None):
     '''
     Returns the latest group_id present in the orders_group table. 
     If no records/invalid records, return 0.
     If have records, return the group_id of that record. 
 
     '''
+    table_name = table_name or _table("order_groups")
     url = f"{supabase_url}/rest/v1/{table_name}"
     headers = {
         "apikey": api_key,
@@ -66,11 +80,12 @@ def get_latest_group_id(supabase_url, api_key, jwt, table_name=order_groups_tabl
         logging.error(f"❌ Failed to fetch latest group_id ({response.status_code}): {response.text}")
         return 0
     
-def get_latest_trades(supabase_url, api_key, jwt, table_name=trades_table):
+def get_latest_trades(supabase_url, api_key, jwt, table_name=None):
     '''
     Returns the most recent trades in trades table 
     If no trades, return None
     '''
+    table_name = table_name or _table("trades")
     url = f"{supabase_url}/rest/v1/{table_name}"
     headers = {
         "apikey": api_key,
@@ -97,8 +112,54 @@ def get_latest_trades(supabase_url, api_key, jwt, table_name=trades_table):
         return None
     
 
+def get_order_groups(supabase_url, api_key, jwt, order_ids=None, group_ids=None, limit=50, table_name=None):
+    '''
+    Returns order_groups rows (group_id, order_id, type, direction, breakeven_threshold, breakeven_price),
+    newest group first: the rows of the given order_ids and/or group_ids, otherwise the `limit` most recent.
+    If no rows or the request fails, return an empty list.
+    '''
+    if (order_ids is not None and not order_ids) or (group_ids is not None and not group_ids):
+        return []
+    table_name = table_name or _table("order_groups")
+    url = f"{supabase_url}/rest/v1/{table_name}"
+    headers = {
+        "apikey": api_key,
+        "Authorization": f"Bearer {jwt}",
+        "Content-Type": "application/json",
+    }
+
+    params = {
+        "select": "group_id,order_id,type,direction,breakeven_threshold,breakeven_price",
+        "order": "group_id.desc",
+    }
+    if order_ids is not None:
+        params["order_id"] = f"in.({','.join(str(i) for i in order_ids)})"
+    if group_ids is not None:
+        params["group_id"] = f"in.({','.join(str(i) for i in group_ids)})"
+    if order_ids is None and group_ids is None:
+        params["limit"] = limit
+
+    response = requests.get(url, headers=headers, params=params)
+
+    if response.status_code == 200:
+        return response.json() or []
+    else:
+        logging.error(f"❌ Failed to fetch order groups ({response.status_code}): {response.text}")
+        return []
+
+def get_bracket_rows(order_ids, supabase_url, api_key, jwt, table_name=None):
+    '''
+    Returns every order_groups row of the groups the given orders belong to, so a leg's siblings are
+    found however old the group is, including siblings that already filled or were cancelled.
+    '''
+    rows = get_order_groups(supabase_url, api_key, jwt, order_ids=list(order_ids), table_name=table_name)
+    group_ids = sorted({row['group_id'] for row in rows})
+    return get_order_groups(supabase_url, api_key, jwt, group_ids=group_ids, table_name=table_name)
+
    
 if __name__ == '__main__':
+    from dotenv import load_dotenv
+    load_dotenv()
     supabase_url = os.getenv("SUPABASE_URL")
     order_table_name = os.getenv("ORDER_TABLE")
     supabase_api_key = os.getenv("SUPABASE_API_KEY")
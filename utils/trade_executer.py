@@ -1,39 +1,118 @@
 import time
 import hmac
 import hashlib
+import json
 import requests
+import threading
+from decimal import Decimal
+from urllib.parse import urlencode
 import logging 
 import os 
-from dotenv import load_dotenv
 
-load_dotenv()
+def _wire(value):
+    """ Render a param the way the API expects it: Decimals in plain notation, never '1.23E-5'. """
+    return format(value, 'f') if isinstance(value, Decimal) else str(value)
+
 
 class BinanceFuturesTrader:
     BASE_URL = 'https://fapi.binance.com'
+    BATCH_CANCEL_LIMIT = 10
+    BATCH_PLACE_LIMIT = 5
 
     def __init__(self):
         self.api_key = os.getenv('BINANCE_API_KEY')
         self.api_secret = os.getenv('BINANCE_API_SECRET')
         self.max_retries = 10
-        self.retry_delays = 2
+        self.retry_delay = 2
+        self._local = threading.local()  # latency of the last request made on this thread
 
     def _sign(self, params):
-        query_string = '&'.join([f"{k}={v}" for k, v in params.items()])
+        # urlencode matches what requests puts on the wire, which matters for the JSON payloads of batch endpoints
+        query_string = urlencode(params)
         signature = hmac.new(self.api_secret.encode(), query_string.encode(), hashlib.sha256).hexdigest()
         return signature
 
-    def _post(self, endpoint, params):
+    def _request(self, method, endpoint, params):
+        params = {k: _wire(v) for k, v in params.items()}
         params['timestamp'] = int(time.time() * 1000)
         params['signature'] = self._sign(params)
         headers = {"X-MBX-APIKEY": self.api_key}
-        response = requests.post(f"{self.BASE_URL}{endpoint}", headers=headers, params=params)
+        start = time.perf_counter()
+        response = requests.request(method, f"{self.BASE_URL}{endpoint}", headers=headers, params=params)
+        self._local.latency_ms = round((time.perf_counter() - start) * 1000, 2)
+        log_ctx = {"symbol": params.get('symbol'), "latency_ms": self._local.latency_ms}
+        logging.debug("%s %s -> %s", method, endpoint, response.status_code, extra=log_ctx)
         try:
             response.raise_for_status()
         except Exception as e:
-            logging.error("HTTP Error: ", e)
-            logging.error("Response body:", response.text)
+            logging.error("HTTP Error: %s", e, extra=log_ctx)
+            logging.error("Response body: %s", response.text, extra=log_ctx)
         return response.json()
 
+    def _order_ctx(self, symbol, order_id):
+        """ Structured fields for order-result logs, including the round-trip of the request just made. """
+        return {"symbol": symbol, "order_id": order_id, "latency_ms": getattr(self._local, 'latency_ms', None)}
+
+    def _get(self, endpoint, params):
+        return self._request('GET', endpoint, params)
+
+    def _post(self, endpoint, params):
+        return self._request('POST', endpoint, params)
+
+    def _delete(self, endpoint, params):
+        return self._request('DELETE', endpoint, params)
+
+    def get_open_orders(self, symbol=None):
+        params = {'symbol': symbol} if symbol else {}
+        return self._get('/fapi/v1/openOrders', params)
+
+    def get_position_risk(self, symbol=None):
+        params = {'symbol': symbol} if symbol else {}
+        return self._get('/fapi/v2/positionRisk', params)
+
+    def get_usdt_balance(self):
+        """ USDT margin balance (wallet balance + unrealized PnL) from /fapi/v2/balance. """
+        for asset in self._get('/fapi/v2/balance', {}):
+            if asset['asset'] == 'USDT':
+                return float(asset['balance']) + float(asset['crossUnPnl'])
+        return 0.0
+
+    def cancel_all_open_orders(self, symbol):
+        params = {'symbol': symbol}
+        res = self._delete('/fapi/v1/allOpenOrders', params)
+        logging.info("Cancelled all open orders: %s", res, extra={"symbol": symbol})
+        return res
+
+    def cancel_batch_orders(self, symbol, order_ids):
+        """ Cancel up to BATCH_CANCEL_LIMIT orders per call. Returns one response entry per order. """
+        results = []
+        order_ids = list(order_ids)
+        for i in range(0, len(order_ids), self.BATCH_CANCEL_LIMIT):
+            chunk = order_ids[i:i + self.BATCH_CANCEL_LIMIT]
+            params = {'symbol': symbol, 'orderIdList': json.dumps(chunk, separators=(',', ':'))}
+            results.extend(self._delete('/fapi/v1/batchOrders', params))
+        logging.info("Batch cancelled orders %s: %s", order_ids, results, extra={"symbol": symbol})
+        return results
+
+    def place_batch_orders(self, orders):
+        """ Place up to BATCH_PLACE_LIMIT orders per call. Each order is a dict of /fapi/v1/order params. """
+        results = []
+        for i in range(0, len(orders), self.BATCH_PLACE_LIMIT):
+            chunk = [{k: _wire(v) for k, v in order.items()} for order in orders[i:i + self.BATCH_PLACE_LIMIT]]
+            params = {'batchOrders': json.dumps(chunk, separators=(',', ':'))}
+            results.extend(self._post('/fapi/v1/batchOrders', params))
+        logging.info("Batch placed orders: %s", results)
+        return results
+
+    def cancel_order(self, symbol, order_id):
+        params = {'symbol': symbol, 'orderId': order_id}
+        res = self._delete('/fapi/v1/order', params)
+        if 'orderId' in res:
+            logging.info("Successfully cancelled ORDER with ID: %s", order_id, extra=self._order_ctx(symbol, order_id))
+        else:
+            logging.warning("Cancel response missing orderId: %s", res, extra={"symbol": symbol, "order_id": order_id})
+        return res
+
     def set_leverage(self, symbol, leverage):
         params = {'symbol': symbol, 'leverage': leverage}
         return self._post('/fapi/v1/leverage', params)
@@ -47,20 +126,20 @@ class BinanceFuturesTrader:
         }
         for attempt in range(1, self.max_retries + 1):
             try: 
-                self.res = self._post('/fapi/v1/order', params)
-                if 'orderId' in self.res:
-                    logging.info(f"Successfully executed MARKET IN ORDER with ID: {self.res['orderId']}")
-                    return self.res 
+                res = self._post('/fapi/v1/order', params)
+                if 'orderId' in res:
+                    logging.info("Successfully executed MARKET IN ORDER with ID: %s", res['orderId'], extra=self._order_ctx(symbol, res['orderId']))
+                    return res 
                 else:
-                    logging.warning(f"MARKET IN order response missing orderId: {self.res}")
+                    logging.warning("MARKET IN order response missing orderId: %s", res, extra={"symbol": symbol})
             except Exception as e:
-                logging.error(f"[Attempt {attempt}] Failed to MARKET IN | Error: {e}")
+                logging.error("[Attempt %s] Failed to MARKET IN | Error: %s", attempt, e, extra={"symbol": symbol})
                 if attempt == self.max_retries:
                     logging.critical("Max retries reached. Giving up.")
                     raise
                 time.sleep(self.retry_delay)
 
-    def set_stop_loss(self, symbol, side, stop_price, quantity):
+    def set_stop_loss(self, symbol, side, stop_price, quantity, reduce_only=False):
         params = {
             'symbol': symbol,
             'side': side,
@@ -69,17 +148,20 @@ class BinanceFuturesTrader:
             'quantity': quantity,
             'timeInForce': 'GTC'
         }
+        if reduce_only:
+            # a replacement SL must never open a position if the one it protects has already closed
+            params['reduceOnly'] = 'true'
 
         for attempt in range(1, self.max_retries + 1):
             try:
-                self.res = self._post('/fapi/v1/order', params)
-                if 'orderId' in self.res:
-                    logging.info(f"Successfully executed STOPLOSS ORDER with ID: {self.res['orderId']}")
+                res = self._post('/fapi/v1/order', params)
+                if 'orderId' in res:
+                    logging.info("Successfully executed STOPLOSS ORDER with ID: %s", res['orderId'], extra=self._order_ctx(symbol, res['orderId']))
                 else:
-                    logging.warning(f"STOPLOSS order response missing orderId: {self.res}")
-                return self.res
+                    logging.warning("STOPLOSS order response missing orderId: %s", res, extra={"symbol": symbol})
+                return res
             except Exception as e:
-                logging.error(f"[Attempt {attempt}] Failed to set stop loss | Error: {e}")
+                logging.error("[Attempt %s] Failed to set stop loss | Error: %s", attempt, e, extra={"symbol": symbol})
                 if attempt == self.max_retries:
                     logging.critical("Max retries reached. Giving up.")
                     raise
@@ -101,14 +183,14 @@ class BinanceFuturesTrader:
 
         for attempt in range(1, self.max_retries + 1):
             try:
-                self.res = self._post('/fapi/v1/order', params)
-                if 'orderId' in self.res:
-                    logging.info(f"Successfully executed TAKEPROFIT ORDER with ID: {self.res['orderId']}")
+                res = self._post('/fapi/v1/order', params)
+                if 'orderId' in res:
+                    logging.info("Successfully executed TAKEPROFIT ORDER with ID: %s", res['orderId'], extra=self._order_ctx(symbol, res['orderId']))
                 else:
-                    logging.warning(f"TAKEPROFIT order response missing orderId: {self.res}")
-                return self.res
+                    logging.warning("TAKEPROFIT order response missing orderId: %s", res, extra={"symbol": symbol})
+                return res
             except Exception as e:
-                logging.error(f"[Attempt {attempt}] Failed to set TAKEPROFIT | Error: {e}")
+                logging.error("[Attempt %s] Failed to set TAKEPROFIT | Error: %s", attempt, e, extra={"symbol": symbol})
                 if attempt == self.max_retries:
                     logging.critical("Max retries reached. Giving up.")
                     raise
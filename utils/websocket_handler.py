@@ -3,6 +3,23 @@ import asyncio, json, logging, websockets
 from websockets.exceptions import ConnectionClosedError, ConnectionClosedOK
 from datetime import datetime
 
+def parse_kline_message(msg):
+    """
+    Decode one raw kline message. Returns the candle dict for a closed candle, None otherwise.
+    """
+    k = json.loads(msg).get("k", {})
+    if not k.get("x"):               # candle still open
+        return None
+    return {
+        "timestamp": datetime.fromtimestamp(k["t"] / 1000).strftime('%Y-%m-%d %H:%M:%S'),
+        "open":  float(k["o"]),
+        "high":  float(k["h"]),
+        "low":   float(k["l"]),
+        "close": float(k["c"]),
+        "volume":float(k["v"]),
+        "close_time": k["T"],
+    }
+
 async def candle_stream(symbol: str, interval: str = "1m"):
     """
     Async generator that yields a dict every time a candle closes.
@@ -16,18 +33,9 @@ async def candle_stream(symbol: str, interval: str = "1m"):
             async with websockets.connect(ws_url, ping_interval=20, ping_timeout=10) as ws:
                 logging.info(f"✅ Connected to {symbol.upper()} {interval} stream")
                 async for msg in ws:  # keeps reading until socket dies
-                    data = json.loads(msg)
-                    k = data.get("k", {})
-                    if k.get("x"):    # closed candle
-                        candle = {
-                            "timestamp": datetime.fromtimestamp(k["t"] / 1000).strftime('%Y-%m-%d %H:%M:%S'),
-                            "open":  float(k["o"]),
-                            "high":  float(k["h"]),
-                            "low":   float(k["l"]),
-                            "close": float(k["c"]),
-                            "volume":float(k["v"]),
-                        }
-                        logging.info(f"📊 Candle Closed - {symbol.upper()} {interval}: {candle}")
+                    candle = parse_kline_message(msg)
+                    if candle is not None:
+                        logging.info("📊 Candle Closed - %s %s: %s", symbol.upper(), interval, candle, extra={"symbol": symbol.upper()})
                         yield candle
         except (ConnectionClosedError, ConnectionClosedOK) as e:
             logging.warning(f"🔌 WebSocket closed: {e}. Reconnecting…")
@@ -35,3 +43,30 @@ async def candle_stream(symbol: str, interval: str = "1m"):
             logging.exception("🔥 Unexpected WebSocket error:")
 
         await asyncio.sleep(2)        # small back-off before reconnect
+
+async def book_ticker_stream(symbol: str):
+    """
+    Async generator that yields the best bid/ask on every book update.
+    Same reconnect behaviour as candle_stream.
+    """
+    ws_url = f"wss://fstream.binance.com/ws/{symbol.lower()}@bookTicker"
+    logging.info(f"Connecting to {ws_url}")
+
+    while True:
+        try:
+            async with websockets.connect(ws_url, ping_interval=20, ping_timeout=10) as ws:
+                logging.info(f"✅ Connected to {symbol.upper()} bookTicker stream")
+                async for msg in ws:
+                    data = json.loads(msg)
+                    if "b" in data and "a" in data:
+                        yield {
+                            "symbol": data.get("s", symbol.upper()),
+                            "bid": float(data["b"]),
+                            "ask": float(data["a"]),
+                        }
+        except (ConnectionClosedError, ConnectionClosedOK) as e:
+            logging.warning(f"🔌 WebSocket closed: {e}. Reconnecting…")
+        except Exception:
+            logging.exception("🔥 Unexpected WebSocket error:")
+
+        await asyncio.sleep(2)